@@ -0,0 +1,188 @@
+import ProductionLine, Metrics
+from Items import *
+from datetime import datetime
+from typing import Any
+import argparse, json, platform, sys, time, tracemalloc
+
+#Benchmarks the production line pipeline (enumerating, solving, specialising and calculating stats) for each target item
+#The results are saved as JSON so a later run on the same machine can be compared against them as a baseline
+
+#Change when the results change meaning, baselines from other versions can't be compared
+BENCHMARK_VERSION = 1
+#The default file the results are saved to
+DEFAULT_OUTPUT = "Benchmark.json"
+#Items which take too long to benchmark by default
+SLOW_ITEMS = {CRAFTING_ITEM.magical_knowledge_tome_lv3}
+#The phases of the pipeline, in order
+PHASES = ["enumerate", "solve", "specialise", "solveSpecialised", "stats"]
+#The change in a time or peak memory (as a fraction of the baseline) reported as a regression
+DEFAULT_THRESHOLD = 0.1
+#The number of timed runs of each item, the fastest time of each phase is kept to reduce noise
+DEFAULT_REPEAT = 3
+
+#Runs the pipeline for the given item, returns the counts and the time of each phase
+#Specialised lines which become invalid are counted rather than raising, so a benchmark always finishes
+def RunPipeline(item: ITEM, amount: float) -> dict[str, Any]:
+    result: dict[str, Any] = {"times": dict()}
+    times: dict[str, float] = result["times"]
+
+    start = time.perf_counter()
+    lines = ProductionLine.CreateProductionLines(item)
+    times["enumerate"] = time.perf_counter() - start
+    result["lines"] = len(lines)
+
+    start = time.perf_counter()
+    validLines: list[ProductionLine.ProductionLine] = []
+    cycles = 0
+    for line in lines:
+        line.CalculateItemData(amount)
+        cycles += line.cycles
+        if line.valid:
+            validLines.append(line)
+    times["solve"] = time.perf_counter() - start
+    result["valid"] = len(validLines)
+
+    start = time.perf_counter()
+    lineVariants = [ProductionLine.SpecialiseProductionLine(line) for line in validLines]
+    times["specialise"] = time.perf_counter() - start
+    result["variants"] = sum(len(variants) for variants in lineVariants)
+
+    start = time.perf_counter()
+    validVariants: list[ProductionLine.ProductionLine] = []
+    for variants in lineVariants:
+        ProductionLine.CalculateVariantItemData(variants, amount)
+        for variant in variants:
+            cycles += variant.cycles
+            if variant.valid:
+                validVariants.append(variant)
+    times["solveSpecialised"] = time.perf_counter() - start
+    result["validVariants"] = len(validVariants)
+    result["cycles"] = cycles
+
+    start = time.perf_counter()
+    for variant in validVariants:
+        variant.CalculateStats()
+    times["stats"] = time.perf_counter() - start
+    return result
+
+#Returns the benchmark results for the given item, the peak memory is found by running the pipeline again with tracemalloc (it slows down the timed runs)
+#The metrics (see Metrics.py) are recorded in another run for the same reason
+def BenchmarkItem(item: ITEM, amount: float, memory: bool, repeat: int = DEFAULT_REPEAT, recordMetrics: bool = False) -> dict[str, Any]:
+    try:
+        result = RunPipeline(item, amount)
+        for _ in range(repeat - 1):
+            times = RunPipeline(item, amount)["times"]
+            for phase in PHASES:
+                result["times"][phase] = min(result["times"][phase], times[phase])
+        result["total"] = sum(result["times"].values())
+        if memory:
+            tracemalloc.start()
+            try:
+                RunPipeline(item, amount)
+                result["peakMemory"] = tracemalloc.get_traced_memory()[1]
+            finally:
+                tracemalloc.stop()
+        if recordMetrics:
+            try:
+                Metrics.Enable()
+                RunPipeline(item, amount)
+            finally:
+                recorded = Metrics.Disable()
+            result["metrics"] = recorded.ToDict()
+    except ValueError as e:
+        return {"error": str(e)}
+    return result
+
+#Returns the benchmark results for the given items, printing each as it finishes
+def RunBenchmark(items: list[ITEM], amount: float = 2, memory: bool = True, repeat: int = DEFAULT_REPEAT, recordMetrics: bool = False) -> dict[str, Any]:
+    results: dict[str, Any] = {
+        "version": BENCHMARK_VERSION,
+        "date": datetime.now().isoformat(timespec="seconds"),
+        "machine": {"platform": platform.platform(), "processor": platform.processor(), "python": platform.python_version()},
+        "amount": amount,
+        "repeat": repeat,
+        "items": dict()
+    }
+    for item in items:
+        result = BenchmarkItem(item, amount, memory, repeat, recordMetrics)
+        results["items"][item.name] = result
+        if "error" in result:
+            print(f"{item.name}: Error: {result['error']}")
+        else:
+            print(f"{item.name}: {result['lines']} lines, {result['valid']} valid, {result['variants']} variants, {result['cycles']} cycles, {result['total']:.3f}s" +
+                  (f", {result['peakMemory'] / 1024 / 1024:.1f}MB" if "peakMemory" in result else ""))
+    return results
+
+#Returns the differences between the results and the baseline, as lines to print
+#Counts should never change unless the pipeline's results change, times and peak memory are regressions when they increase by more than the threshold
+def CompareResults(results: dict[str, Any], baseline: dict[str, Any], threshold: float = DEFAULT_THRESHOLD) -> list[str]:
+    if baseline.get("version") != results["version"] or baseline.get("amount") != results["amount"]:
+        return ["The baseline is for a different benchmark version or amount, it can't be compared"]
+    if baseline.get("machine") != results["machine"]:
+        differences = ["Warning: the baseline is from a different machine"]
+    else:
+        differences = []
+
+    totals = [0.0, 0.0]
+    for name, result in results["items"].items():
+        if name not in baseline["items"]:
+            continue
+        base = baseline["items"][name]
+        if "error" in result or "error" in base:
+            if result.get("error") != base.get("error"):
+                differences.append(f"{name}: Error changed from {base.get('error')} to {result.get('error')}")
+            continue
+
+        for count in ["lines", "valid", "variants", "validVariants", "cycles"]:
+            if result[count] != base[count]:
+                differences.append(f"{name}: {count} changed from {base[count]} to {result[count]}")
+        for phase in PHASES + ["total"]:
+            baseTime = base["times"][phase] if phase != "total" else base["total"]
+            newTime = result["times"][phase] if phase != "total" else result["total"]
+            #Ignore phases too short to time reliably
+            if baseTime > 0.01 and newTime > baseTime * (1 + threshold):
+                differences.append(f"{name}: {phase} slower, {baseTime:.3f}s -> {newTime:.3f}s ({newTime / baseTime - 1:+.0%})")
+        if "peakMemory" in result and "peakMemory" in base and result["peakMemory"] > base["peakMemory"] * (1 + threshold):
+            differences.append(f"{name}: Peak memory higher, {base['peakMemory']} -> {result['peakMemory']} ({result['peakMemory'] / base['peakMemory'] - 1:+.0%})")
+        totals[0] += base["total"]
+        totals[1] += result["total"]
+
+    if totals[0] > 0:
+        differences.append(f"Total: {totals[0]:.3f}s -> {totals[1]:.3f}s ({totals[1] / totals[0] - 1:+.0%})")
+    return differences
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks the production line pipeline for each target item")
+    parser.add_argument("items", nargs="*", help="The target items (defaults to every crafting item except the slow ones)")
+    parser.add_argument("--amount", type=float, default=2, help="The amount of the target item to produce")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help="The file the results are saved to")
+    parser.add_argument("--compare", help="A baseline results file to compare against")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT, help="The number of timed runs of each item")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="The increase in time or peak memory reported as a regression")
+    parser.add_argument("--no-memory", action="store_true", help="Don't find the peak memory")
+    parser.add_argument("--metrics", action="store_true", help="Record the planner metrics of each item (see Metrics.py)")
+    args = parser.parse_args()
+
+    if args.items:
+        items = [GetItem(name) for name in args.items]
+    else:
+        items = [item for item in CRAFTING_ITEM if item not in SLOW_ITEMS]
+
+    #Read the baseline first, so it can't be overwritten before it's compared against
+    baseline = None
+    if args.compare:
+        with open(args.compare, "r") as file:
+            baseline = json.load(file)
+
+    results = RunBenchmark(items, args.amount, not args.no_memory, max(1, args.repeat), args.metrics)
+    with open(args.output, "w") as file:
+        json.dump(results, file, indent=4)
+
+    if baseline is not None:
+        differences = CompareResults(results, baseline, args.threshold)
+        print("\n".join(differences) if differences else "No differences from the baseline")
+        if any(not difference.startswith(("Total", "Warning")) for difference in differences):
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -60,4 +60,11 @@ def GetBuildingGroup(type: BUILDING):
     elif isinstance(type, PASSIVE):
         return BUILDING_GROUP.PASSIVE
     
-    TypeError("Failed to convert building type to group")
\ No newline at end of file
+    TypeError("Failed to convert building type to group")
+
+#Returns the building with the given name
+def GetBuilding(name: str) -> BUILDING:
+    for buildingType in [PRODUCER, CRAFTER, CONVERTER, PASSIVE]:
+        if name in buildingType.__members__:
+            return buildingType[name]
+    raise ValueError(f"There is no building called {name}")
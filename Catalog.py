@@ -0,0 +1,114 @@
+import Recipe, Speciality, WorkUnits, Buildings, Town
+from Items import *
+from typing import Any
+
+#Static facts about the recipes, compiled once so the hot paths are lookups rather than scans of the data
+#Items, recipes and buildings get dense integer ids (their index in the catalog lists), the per-recipe data is indexed by recipe id
+
+class Catalog():
+    items: list[ITEM]
+    itemIds: dict[ITEM, int]
+    recipes: list[Recipe.BaseRecipe]
+    recipeIds: dict[Recipe.BaseRecipe, int]
+    buildings: list[Buildings.BUILDING]
+    buildingIds: dict[Buildings.BUILDING, int]
+
+    #Stores the primary recipes for each item (None if there are no recipes for the item)
+    primaryRecipes: list[list[Recipe.BaseRecipe] | None]
+
+    #Stores the happiness production boost of the default town state
+    productionBoost: float
+    #Stores the optimal work unit building config for each building in the default town state
+    buildingConfigs: list[WorkUnits.BuildingConfig]
+    #Stores the building id of each recipe
+    recipeBuildings: list[int]
+    #Stores the inputs and building resources of each recipe (using the optimal building config)
+    recipeInputs: list[set[ITEM]]
+
+    #Stores the production boost of each speciality at each town level (up to Town.MAX_TOWN_LEVEL)
+    productionBoosts: dict[Speciality.SPECIALITY, list[float]]
+    #Stores the specialities any output of each recipe can use
+    recipeSpecialities: list[set[Speciality.SPECIALITY]]
+    #Stores the boost at Town.MAX_TOWN_LEVEL from each speciality each output of each recipe can use
+    outputBoosts: list[dict[ITEM, dict[Speciality.SPECIALITY, float]]]
+    #Stores the best boost at Town.MAX_TOWN_LEVEL any speciality gives each output of each recipe
+    bestOutputBoosts: list[dict[ITEM, float]]
+
+    def __init__(self, manager: Recipe.RecipeManager) -> None:
+        self.items = list(NATURAL_RESOURCE) + list(CRAFTING_ITEM) + list(POWER)
+        self.itemIds = {item: id for id, item in enumerate(self.items)}
+        self.recipes = list(manager.byId.values())
+        self.recipeIds = {recipe: id for id, recipe in enumerate(self.recipes)}
+        self.buildings = list(Buildings.PRODUCER) + list(Buildings.CRAFTER) + list(Buildings.PASSIVE) + list(Buildings.CONVERTER)
+        self.buildingIds = {building: id for id, building in enumerate(self.buildings)}
+
+        self.primaryRecipes = [manager.GetPrimary(item) if item in manager.recipes else None for item in self.items]
+
+        self.productionBoost = Town.defaultState.GetProductionBoost()
+        self.buildingConfigs = [WorkUnits.GetBuildingConfig(building) for building in self.buildings]
+        self.recipeBuildings = [self.buildingIds[recipe.building] for recipe in self.recipes]
+        self.recipeInputs = []
+        for recipe, buildingId in zip(self.recipes, self.recipeBuildings):
+            self.recipeInputs.append(set(recipe.inputs.keys()).union(self.buildingConfigs[buildingId].GetItemSuppliers().keys()))
+
+        self.productionBoosts = {speciality: [Speciality.GetProductionBoost(speciality, level) for level in range(Town.MAX_TOWN_LEVEL + 1)] for speciality in Speciality.SPECIALITY}
+        self.recipeSpecialities = []
+        self.outputBoosts = []
+        self.bestOutputBoosts = []
+        for recipe in self.recipes:
+            specialities: set[Speciality.SPECIALITY] = set()
+            boosts: dict[ITEM, dict[Speciality.SPECIALITY, float]] = dict()
+            for item in recipe.outputs.keys():
+                outputSpecialities = Speciality.GetSpecialities(item, recipe.building)
+                specialities.update(outputSpecialities)
+                boosts[item] = {speciality: self.productionBoosts[speciality][Town.MAX_TOWN_LEVEL] for speciality in outputSpecialities}
+            self.recipeSpecialities.append(specialities)
+            self.outputBoosts.append(boosts)
+            self.bestOutputBoosts.append({item: max([1] + list(itemBoosts.values())) for item, itemBoosts in boosts.items()})
+
+    #Returns the primary recipes for the given item using the buildings unlocked in the given town state (shared, don't change it)
+    def GetPrimary(self, item: ITEM, state: Town.TownState | None = None) -> list[Recipe.BaseRecipe]:
+        recipes = self.primaryRecipes[self.itemIds[item]]
+        if recipes is None:
+            raise ValueError(f"There is no recipe for the {item}")
+        if state is not None and state.unlockedBuildings is not None:
+            return [recipe for recipe in recipes if state.IsUnlocked(recipe.building)]
+        return recipes
+
+    #Returns the optimal work unit building config for the given building in the given town state (shared, don't change it)
+    def GetBuildingConfig(self, building: Buildings.BUILDING, state: Town.TownState | None = None) -> WorkUnits.BuildingConfig:
+        if state is None or state.GetProductionBoost() == self.productionBoost:
+            return self.buildingConfigs[self.buildingIds[building]]
+        return WorkUnits.GetBuildingConfig(building, True, state)
+
+    #Returns the inputs and building resources of the given recipe using the optimal building config (shared, don't change it)
+    def GetInputsAndResource(self, recipe: Recipe.BaseRecipe) -> set[ITEM]:
+        return self.recipeInputs[self.recipeIds[recipe]]
+
+    #Returns the specialities any output of the given recipe can use (shared, don't change it)
+    def GetRecipeSpecialities(self, recipe: Recipe.BaseRecipe) -> set[Speciality.SPECIALITY]:
+        return self.recipeSpecialities[self.recipeIds[recipe]]
+
+    #Returns the production boost the given speciality gives the given output of the given recipe at the given town level
+    def GetSpecialityBoost(self, recipe: Recipe.BaseRecipe, item: ITEM, speciality: Speciality.SPECIALITY, townLevel: int = Town.MAX_TOWN_LEVEL) -> float:
+        boosts = self.outputBoosts[self.recipeIds[recipe]][item]
+        if townLevel >= Town.MAX_TOWN_LEVEL or speciality not in boosts:
+            return boosts.get(speciality, 1)
+        return self.productionBoosts[speciality][max(0, townLevel)]
+
+    #Returns the best production boost any speciality gives the given output of the given recipe
+    def GetBestSpecialityBoost(self, recipe: Recipe.BaseRecipe, item: ITEM) -> float:
+        return self.bestOutputBoosts[self.recipeIds[recipe]][item]
+
+#Returns the catalog of the recipes in Recipe.manager, it's compiled the first time it's needed
+def GetCatalog() -> Catalog:
+    global catalog
+    if "catalog" not in globals():
+        catalog = Catalog(Recipe.manager)
+    return catalog
+
+#The catalog (Catalog.catalog) is only compiled when it's first used, after that it's a normal module attribute
+def __getattr__(name: str) -> Any:
+    if name == "catalog":
+        return GetCatalog()
+    raise AttributeError(f"module {__name__} has no attribute {name}")
@@ -0,0 +1,61 @@
+from typing import Callable, Iterable, TypeVar
+
+#Graph analysis used to order the updates of a production line
+#Finds the strongly connected components with Tarjan's algorithm, which is linear in the number of nodes and edges
+
+T = TypeVar('T')
+
+#Returns the strongly connected components of the graph with the given nodes and edges (from each node to the nodes it affects)
+#The components are in topological order, every edge between two components goes from an earlier component to a later one
+#The nodes in each component are in the order they were first visited
+def GetStronglyConnectedComponents(nodes: Iterable[T], getEdges: Callable[[T], Iterable[T]]) -> list[list[T]]:
+    index: dict[T, int] = dict()
+    lowLink: dict[T, int] = dict()
+    onStack: set[T] = set()
+    stack: list[T] = []
+    components: list[list[T]] = []
+
+    for root in nodes:
+        if root in index:
+            continue
+        #Depth first search without recursion, each entry is a node and the iterator over it's remaining edges
+        index[root] = lowLink[root] = len(index)
+        stack.append(root)
+        onStack.add(root)
+        searchStack: list[tuple[T, Iterable[T]]] = [(root, iter(getEdges(root)))]
+        while searchStack:
+            node, edges = searchStack[-1]
+            for nextNode in edges:
+                if nextNode not in index:
+                    index[nextNode] = lowLink[nextNode] = len(index)
+                    stack.append(nextNode)
+                    onStack.add(nextNode)
+                    searchStack.append((nextNode, iter(getEdges(nextNode))))
+                    break
+                elif nextNode in onStack:
+                    lowLink[node] = min(lowLink[node], index[nextNode])
+            else:
+                #Every edge has been searched, so the node is finished
+                searchStack.pop()
+                if searchStack:
+                    parent = searchStack[-1][0]
+                    lowLink[parent] = min(lowLink[parent], lowLink[node])
+                #The node is the root of a component, everything above it on the stack is in the component
+                if lowLink[node] == index[node]:
+                    component: list[T] = []
+                    while True:
+                        member = stack.pop()
+                        onStack.remove(member)
+                        component.append(member)
+                        if member == node:
+                            break
+                    component.reverse()
+                    components.append(component)
+
+    #Components are found after every component they have edges to, so reverse them for the topological order
+    components.reverse()
+    return components
+
+#Returns whether the given component is a cycle (more than one node or a node with an edge to itself)
+def IsCycle(component: list[T], getEdges: Callable[[T], Iterable[T]]) -> bool:
+    return len(component) > 1 or component[0] in getEdges(component[0])
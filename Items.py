@@ -33,3 +33,14 @@ POWER = Enum('POWER',
      'worker_speed_boost','regen_boost'])
 
 type ITEM = NATURAL_RESOURCE | CRAFTING_ITEM | POWER
+
+#Returns whether there is an item with the given name
+def IsItem(name: str) -> bool:
+    return any(name in itemType.__members__ for itemType in [NATURAL_RESOURCE, CRAFTING_ITEM, POWER])
+
+#Returns the item with the given name
+def GetItem(name: str) -> ITEM:
+    for itemType in [NATURAL_RESOURCE, CRAFTING_ITEM, POWER]:
+        if name in itemType.__members__:
+            return itemType[name]
+    raise ValueError(f"There is no item called {name}")
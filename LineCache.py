@@ -0,0 +1,141 @@
+import ProductionLine, WorkUnits, Happiness, Catalog, Town
+from Items import *
+from typing import Any
+import hashlib, os, pickle
+
+#Caches the evaluated production lines for each target item, amount and town state on disk, so repeated analyses don't enumerate and evaluate them again
+#Each entry is keyed by a fingerprint of the recipe, work unit and speciality data, entries for any other fingerprint are stale and are removed
+#The cache directory is kept under a size limit by removing the least recently used entries
+
+#Change when the evaluation of production lines changes, so entries from older versions are stale
+CACHE_VERSION = 7
+#The default directory and size limit of the cache
+DEFAULT_DIRECTORY = "Cache"
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+#Returns a fingerprint of the data the evaluated production lines depend on
+def GetFingerprint() -> str:
+    catalog = Catalog.catalog
+    data: list[Any] = [CACHE_VERSION]
+    for recipe, boosts in zip(catalog.recipes, catalog.outputBoosts):
+        data.append((recipe.id, recipe.work_units, [(item.name, sorted((speciality.name, boost) for speciality, boost in itemBoosts.items())) for item, itemBoosts in boosts.items()]))
+    data.append(sorted((speciality.name, boosts) for speciality, boosts in catalog.productionBoosts.items()))
+    data.append([(supplier.name, repr(stats)) for supplier, stats in WorkUnits.supplier_stats.items()])
+    data.append([(group.name, [supplier.name for supplier in suppliers]) for group, suppliers in WorkUnits.group_suppliers.items()])
+    data.append([(building.name, repr(mods)) for building, mods in WorkUnits.building_supplier_mods.items()])
+    data.append((Happiness.happiness_thresholds, Happiness.production_boosts))
+    return hashlib.sha256(repr(data).encode()).hexdigest()
+
+class LineCache():
+    directory: str
+    maxBytes: int
+    #Stores the fingerprint of the current data (found the first time it's needed)
+    fingerprint: str | None
+
+    def __init__(self, directory: str = DEFAULT_DIRECTORY, maxBytes: int = DEFAULT_MAX_BYTES) -> None:
+        self.directory = directory
+        self.maxBytes = maxBytes
+        self.fingerprint = None
+
+    #Returns the fingerprint of the current data
+    def GetFingerprint(self) -> str:
+        if self.fingerprint is None:
+            self.fingerprint = GetFingerprint()
+        return self.fingerprint
+
+    #Returns the path of the entry for the given target item, amount and town state
+    #Entries are named by the fingerprint first, so the stale ones can be found without opening them
+    def GetPath(self, item: ITEM, amount: float, state: Town.TownState | None) -> str:
+        state = Town.defaultState if state is None else state
+        key = hashlib.sha256(repr((item.name, float(amount), state.key)).encode()).hexdigest()
+        return os.path.join(self.directory, f"{self.GetFingerprint()[:16]}-{item.name}-{key[:16]}.pickle")
+
+    #Returns the cached production lines for the given target item, amount and town state (None if they aren't cached)
+    def Load(self, item: ITEM, amount: float = 2, state: Town.TownState | None = None) -> list[ProductionLine.ProductionLine] | None:
+        path = self.GetPath(item, amount, state)
+        try:
+            with open(path, "rb") as file:
+                fingerprint, lines = pickle.load(file)
+        except FileNotFoundError:
+            return None
+        except (pickle.UnpicklingError, EOFError, ValueError, AttributeError):
+            #Unreadable entries (from a crash or an incompatible version) are just recalculated
+            RemoveEntry_Internal(path)
+            return None
+        if fingerprint != self.GetFingerprint():
+            RemoveEntry_Internal(path)
+            return None
+
+        #Mark the entry as recently used (another process may have evicted it since it was read)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            pass
+        return lines
+
+    #Stores the given production lines for the given target item, amount and town state
+    def Store(self, item: ITEM, lines: list[ProductionLine.ProductionLine], amount: float = 2, state: Town.TownState | None = None):
+        os.makedirs(self.directory, exist_ok=True)
+        path = self.GetPath(item, amount, state)
+        #Write to a temporary file first so a partially written entry is never loaded
+        tempPath = f"{path}.{os.getpid()}.tmp"
+        with open(tempPath, "wb") as file:
+            pickle.dump((self.GetFingerprint(), lines), file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tempPath, path)
+        self.Evict()
+
+    #Removes the stale entries, then the least recently used entries until the cache is under it's size limit
+    def Evict(self):
+        prefix = f"{self.GetFingerprint()[:16]}-"
+        entries: list[tuple[float, int, str]] = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(".pickle"):
+                continue
+            path = os.path.join(self.directory, name)
+            if not name.startswith(prefix):
+                RemoveEntry_Internal(path)
+                continue
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        totalBytes = sum(size for _, size, _ in entries)
+        entries.sort()
+        #Always keep the most recently used entry, even if it's over the limit on it's own
+        for _, size, path in entries[:-1]:
+            if totalBytes <= self.maxBytes:
+                break
+            RemoveEntry_Internal(path)
+            totalBytes -= size
+
+    #Removes every entry
+    def Clear(self):
+        if not os.path.isdir(self.directory):
+            return
+        for name in os.listdir(self.directory):
+            if name.endswith(".pickle"):
+                RemoveEntry_Internal(os.path.join(self.directory, name))
+
+    #Returns the valid and finalised production lines for the given item, from the cache if they're in it, otherwise they're evaluated and stored
+    def GetProductionLines(self, item: ITEM, workers: int = 1, chunksize: int = 16, amount: float = 2, state: Town.TownState | None = None) -> list[ProductionLine.ProductionLine]:
+        lines = self.Load(item, amount, state)
+        if lines is None:
+            lines = ProductionLine.GetProductionLines(item, workers, chunksize, amount, state)
+            self.Store(item, lines, amount, state)
+        return lines
+
+#Removes the given cache entry, several processes can share a cache so it may already have been removed
+def RemoveEntry_Internal(path: str):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+#The cache used by GetProductionLines
+cache = LineCache()
+
+#Returns the valid and finalised production lines for the given item using the default cache (see ProductionLine.GetProductionLines)
+def GetProductionLines(item: ITEM, workers: int = 1, chunksize: int = 16, amount: float = 2, state: Town.TownState | None = None) -> list[ProductionLine.ProductionLine]:
+    return cache.GetProductionLines(item, workers, chunksize, amount, state)
@@ -0,0 +1,170 @@
+import ProductionLine, Recipe, WorkUnits, Buildings, Happiness, Catalog, Town
+from Items import *
+import numpy as np
+from typing import Any
+
+#Builds the linear system for the steady state of the given production line
+#Each recipe is the primary producer of exactly one item, so there is one equation (the item is balanced) per recipe
+#Uses the line's speciality boosts and building configs, unless a town level or building configs are given
+#Returns the recipes (the order of the columns) and the matrix and demand vector
+def BuildSystem(line: ProductionLine.ProductionLine, amount: float, townLevel: int | None = None, buildingConfigs: dict[Buildings.BUILDING, WorkUnits.BuildingConfig] | None = None) -> tuple[list[Recipe.BaseRecipe], np.ndarray, np.ndarray]:
+    recipes = line.recipes
+    recipeIndex = {recipe: index for index, recipe in enumerate(recipes)}
+
+    #Map each item with a primary producer to the row of it's balance equation
+    itemIndex: dict[ITEM, int] = dict()
+    for item, relations in line.itemRelations.items():
+        if relations.primaryProducer:
+            itemIndex[item] = recipeIndex[relations.primaryProducer]
+    if len(itemIndex) != len(recipes):
+        raise ValueError("Each recipe should be the primary producer of exactly one item")
+
+    #Net production of each item per unit of scale of each recipe
+    matrix = np.zeros((len(recipes), len(recipes)))
+    for column, recipe in enumerate(recipes):
+        for item, quantity in recipe.outputs.items():
+            if item in itemIndex:
+                matrix[itemIndex[item], column] += quantity * GetSpecialityBoost(line, item, recipe, townLevel)
+        for item, quantity in recipe.inputs.items():
+            if item in itemIndex:
+                matrix[itemIndex[item], column] -= quantity
+        for item, quantity in GetBuildingResources(line, recipe, buildingConfigs).items():
+            if item in itemIndex:
+                matrix[itemIndex[item], column] -= quantity
+
+    demand = np.zeros(len(recipes))
+    for item, quantity in line.GetOutputs(amount).items():
+        #Outputs without a producer can't be satisfied, the check of the item data catches it
+        if item in itemIndex:
+            demand[itemIndex[item]] = quantity
+    return recipes, matrix, demand
+
+#Returns the speciality boost for the given output of the given recipe in the production line, at the given town level (None for the line's own boost)
+def GetSpecialityBoost(line: ProductionLine.ProductionLine, item: ITEM, recipe: Recipe.BaseRecipe, townLevel: int | None) -> float:
+    if townLevel is None or line.optimistic or recipe not in line.recipeSpecialities:
+        return line.GetSpecialityBoost(item, recipe)
+    return Catalog.catalog.GetSpecialityBoost(recipe, item, line.recipeSpecialities[recipe], townLevel)
+
+#Returns the building resources consumed by the given recipe at a scale of 1 using the given building configs (None for the line's own configs)
+def GetBuildingResources(line: ProductionLine.ProductionLine, recipe: Recipe.BaseRecipe, buildingConfigs: dict[Buildings.BUILDING, WorkUnits.BuildingConfig] | None) -> dict[ITEM, float]:
+    if buildingConfigs is None:
+        return line.GetBuildingResources(recipe, 1)
+    buildingConfig = buildingConfigs[recipe.building]
+    if recipe.work_units <= 0 or buildingConfig.work_units <= 0:
+        return dict()
+    buildings = recipe.work_units / buildingConfig.work_units #Allow partial buildings for the resource calculations
+    return {item: buildings * amount for item, amount in buildingConfig.GetItemSuppliers().items()}
+
+#Solves the steady state of the given production line in one step
+#Returns the scale of each recipe, or None if the system is singular or needs a recipe to run in reverse
+def SolveScales(line: ProductionLine.ProductionLine, amount: float) -> dict[Recipe.BaseRecipe, float] | None:
+    recipes, matrix, demand = BuildSystem(line, amount)
+    try:
+        scales = np.linalg.solve(matrix, demand)
+    except np.linalg.LinAlgError:
+        return None
+
+    if not np.all(np.isfinite(scales)) or np.any(scales < -0.0000001):
+        return None
+    return {recipe: max(0.0, float(scale)) for recipe, scale in zip(recipes, scales)}
+
+######################################################################################################################################################
+#Batch evaluation
+
+#The results of evaluating a production line for many target rates and town states, each array has the shape of the broadcast inputs
+class BatchResult():
+    #Stores the target rate, happiness and town level of each evaluation
+    rates: np.ndarray
+    happiness: np.ndarray
+    townLevels: np.ndarray
+
+    #Stores whether the production line can run in each evaluation
+    valid: np.ndarray
+    #Stores the total number of workers (both worker types)
+    workers: np.ndarray
+    #Stores the total of each work unit supplier
+    totalSuppliers: dict[WorkUnits.SUPPLIER, np.ndarray]
+    #Stores the number of buildings for each recipe
+    buildingsPerRecipe: dict[Recipe.BaseRecipe, np.ndarray]
+    #Stores the amount of each base input
+    baseResources: dict[NATURAL_RESOURCE, np.ndarray]
+
+    def __init__(self, rates: np.ndarray, happiness: np.ndarray, townLevels: np.ndarray) -> None:
+        self.rates = rates
+        self.happiness = happiness
+        self.townLevels = townLevels
+        self.valid = np.ones(rates.shape, dtype=bool)
+        self.workers = np.zeros(rates.shape)
+        self.totalSuppliers = dict()
+        self.buildingsPerRecipe = dict()
+        self.baseResources = dict()
+
+#Returns the happiness production boost for each of the given happiness values (same as Happiness.GetProductionBoost)
+def GetHappinessBoosts(happiness: np.ndarray) -> np.ndarray:
+    return np.asarray(Happiness.production_boosts)[np.searchsorted(Happiness.happiness_thresholds, happiness, side="right") - 1]
+
+#Evaluates the given production line for every combination of the given target rates, happiness values and town levels (broadcast together like NumPy arrays)
+#The steady state per unit of the target item only depends on the happiness boost and town level, so it's solved once for each distinct pair
+#Everything else (scales, buildings, suppliers and base resources) is calculated for all the evaluations at once
+def EvaluateBatch(line: ProductionLine.ProductionLine, rates: Any, happiness: Any, townLevels: Any) -> BatchResult:
+    rates, happiness, townLevels = np.broadcast_arrays(np.asarray(rates, dtype=float), np.asarray(happiness), np.asarray(townLevels, dtype=int))
+    result = BatchResult(rates, happiness, townLevels)
+
+    #Find the distinct town states, levels above the max don't boost any further
+    states = np.stack([GetHappinessBoosts(happiness).ravel(), np.clip(townLevels, 0, Town.MAX_TOWN_LEVEL).ravel()], axis=-1)
+    uniqueStates, stateIndex = np.unique(states, axis=0, return_inverse=True)
+    stateIndex = stateIndex.reshape(rates.shape)
+
+    #Solve the scale of each recipe per unit of the target item in each town state
+    recipes = line.recipes
+    boostedRecipes = [recipe for recipe in recipes if not isinstance(recipe.building, Buildings.CONVERTER)]
+    unitScales = np.zeros((len(uniqueStates), len(recipes)))
+    stateValid = np.ones(len(uniqueStates), dtype=bool)
+    buildingWorkUnits = np.zeros((len(uniqueStates), len(boostedRecipes)))
+    resourceOutputs: dict[NATURAL_RESOURCE, np.ndarray] = {item: np.zeros((len(uniqueStates), len(recipes))) for item in line.itemRelations.keys() if isinstance(item, NATURAL_RESOURCE)}
+    for state, (productionBoost, townLevel) in enumerate(uniqueStates):
+        buildingConfigs = {building: WorkUnits.GetBoostedBuildingConfig(building, config.optimal, float(productionBoost)) for building, config in line.buildingConfigs.items()}
+        _, matrix, demand = BuildSystem(line, 1, int(townLevel), buildingConfigs)
+        try:
+            scales = np.linalg.solve(matrix, demand)
+        except np.linalg.LinAlgError:
+            stateValid[state] = False
+            continue
+        if not np.all(np.isfinite(scales)) or np.any(scales < -0.0000001):
+            stateValid[state] = False
+            continue
+        unitScales[state] = np.maximum(scales, 0)
+
+        for column, recipe in enumerate(boostedRecipes):
+            buildingWorkUnits[state, column] = buildingConfigs[recipe.building].work_units
+        for column, recipe in enumerate(recipes):
+            for item, quantity in recipe.outputs.items():
+                if item in resourceOutputs:
+                    resourceOutputs[item][state, column] = quantity * GetSpecialityBoost(line, item, recipe, int(townLevel))
+
+    result.valid = stateValid[stateIndex]
+    scales = unitScales[stateIndex] * rates[..., np.newaxis]
+
+    #Calculate the buildings for each recipe, ignoring rounding errors so exact amounts don't need an extra building
+    boostedColumns = [recipes.index(recipe) for recipe in boostedRecipes]
+    workUnits = scales[..., boostedColumns] * np.asarray([recipe.work_units for recipe in boostedRecipes])
+    buildings = np.ceil(workUnits / buildingWorkUnits[stateIndex] - 0.000000001)
+    for column, recipe in enumerate(boostedRecipes):
+        result.buildingsPerRecipe[recipe] = buildings[..., column]
+
+        #Suppliers don't depend on the happiness, only their work units do
+        optimal_config = line.buildingConfigs[recipe.building]
+        for supplier, amount in optimal_config.suppliers.items():
+            if supplier in optimal_config.resources and not isinstance(optimal_config.resources[supplier], NATURAL_RESOURCE | CRAFTING_ITEM | POWER):
+                if supplier not in result.totalSuppliers:
+                    result.totalSuppliers[supplier] = np.zeros(rates.shape)
+                result.totalSuppliers[supplier] += amount * buildings[..., column]
+
+    for supplier in [WorkUnits.SUPPLIER.WORKER_TYPE_1, WorkUnits.SUPPLIER.WORKER_TYPE_2]:
+        if supplier in result.totalSuppliers:
+            result.workers += result.totalSuppliers[supplier]
+
+    for item, outputs in resourceOutputs.items():
+        result.baseResources[item] = np.sum(scales * outputs[stateIndex], axis=-1)
+
+    return result
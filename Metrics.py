@@ -0,0 +1,101 @@
+from typing import Any
+import json, time
+
+#Counters and timers for the hot paths of the planner, to see where the time goes for slow target items
+#Disabled by default, the hot paths only check whether Metrics.metrics is None before recording anything
+#Only the current process is measured, lines evaluated in worker processes (workers > 1) aren't counted
+
+#Counters recorded by the planner
+#branches: alternative recipes explored while enumerating production lines
+#variantBranches: alternative specialities explored while minimising the speciality variants
+#copies: production lines copied
+#variants: specialised production lines created
+#sharedSolves: speciality variants which used the item data of another variant with the same boosts
+#pruned: branches and chains skipped by the best lines search
+#rejected.validate: enumerated chains rejected by ProductionLine.Validate
+#rejected.divergence: lines rejected because an item diverged while calculating the item data
+#rejected.unsolvable: lines rejected because the linear solver had no solution
+#rejected.unsatisfied: lines rejected because a requirement wasn't satisfied
+#lines: lines the item data was calculated for
+#cycles: total update cycles used calculating the item data
+
+#Timed phases (inclusive, a phase called within another counts towards both)
+#enumerate: enumerating production lines (IterProductionLines)
+#solve: calculating the item data (ProductionLine.CalculateItemData)
+#specialise: creating the speciality variants (SpecialiseProductionLine)
+#stats: calculating the stats (ProductionLine.CalculateStats)
+
+class Metrics():
+    counters: dict[str, int]
+    #Stores the total seconds and the number of calls of each phase
+    times: dict[str, float]
+    calls: dict[str, int]
+    #Stores the number of lines which used each number of update cycles
+    cyclesPerLine: dict[int, int]
+    #Stores when the metrics were started (or last reset)
+    started: float
+
+    def __init__(self) -> None:
+        self.Reset()
+
+    def __str__(self) -> str:
+        lines = [f"Metrics over {time.perf_counter() - self.started:.3f}s"]
+        for name in sorted(self.times):
+            lines.append(f"{name}: {self.times[name]:.3f}s over {self.calls[name]} calls")
+        for name in sorted(self.counters):
+            lines.append(f"{name}: {self.counters[name]}")
+        if self.cyclesPerLine:
+            lines.append(f"Cycles per line: mean {self.counters.get('cycles', 0) / self.counters.get('lines', 1):.1f}, max {max(self.cyclesPerLine)}")
+        return "\n".join(lines) + "\n"
+
+    #Clears every counter and timer
+    def Reset(self):
+        self.counters = dict()
+        self.times = dict()
+        self.calls = dict()
+        self.cyclesPerLine = dict()
+        self.started = time.perf_counter()
+
+    def Count(self, name: str, amount: int = 1):
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    #Adds the given seconds to the given phase
+    def AddTime(self, phase: str, seconds: float):
+        self.times[phase] = self.times.get(phase, 0) + seconds
+        self.calls[phase] = self.calls.get(phase, 0) + 1
+
+    #Records the update cycles used calculating the item data of a line
+    def AddLine(self, cycles: int):
+        self.Count("lines")
+        self.Count("cycles", cycles)
+        self.cyclesPerLine[cycles] = self.cyclesPerLine.get(cycles, 0) + 1
+
+    def ToDict(self) -> dict[str, Any]:
+        return {
+            "elapsed": time.perf_counter() - self.started,
+            "counters": dict(sorted(self.counters.items())),
+            "times": {name: {"seconds": self.times[name], "calls": self.calls[name]} for name in sorted(self.times)},
+            #JSON keys are strings, so they're stored as pairs
+            "cyclesPerLine": sorted(self.cyclesPerLine.items())
+        }
+
+    #Writes the metrics to the given JSON file
+    def Save(self, path: str):
+        with open(path, "w") as file:
+            json.dump(self.ToDict(), file, indent=4)
+
+#The metrics being recorded, None when they're disabled
+metrics: Metrics | None = None
+
+#Starts recording metrics (clearing any already recorded), returns them
+def Enable() -> Metrics:
+    global metrics
+    metrics = Metrics()
+    return metrics
+
+#Stops recording metrics, returns the recorded metrics (None if they weren't enabled)
+def Disable() -> Metrics | None:
+    global metrics
+    recorded = metrics
+    metrics = None
+    return recorded
@@ -0,0 +1,380 @@
+import ProductionLine, Recipe, WorkUnits, Buildings, Catalog, Town, Producers
+from Items import *
+from collections import deque
+from typing import Callable
+import itertools
+
+try:
+    from scipy.optimize import linprog
+except ImportError:
+    linprog = None
+
+#Treats each recipe as a continuous activity level and finds the mix of recipes with the lowest cost
+#Rather than enumerating every production line, the best one is found directly with linear programming
+
+######################################################################################################################################################
+# COSTS
+
+#Cost functions return the cost per unit of scale of a recipe
+#Costs which depend on the building configs are created for a town state (None for the default town state)
+
+#Returns a cost function for the (partial) number of buildings needed per unit of scale in the given town state
+def BuildingsCost(state: Town.TownState | None = None) -> Callable[[Recipe.BaseRecipe], float]:
+    def Cost(recipe: Recipe.BaseRecipe) -> float:
+        if isinstance(recipe.building, Buildings.CONVERTER):
+            return 0
+        buildingConfig = Catalog.catalog.GetBuildingConfig(recipe.building, state)
+        return recipe.work_units / buildingConfig.work_units
+    return Cost
+
+#Returns a cost function for the (partial) number of workers needed per unit of scale in the given town state
+def WorkersCost(state: Town.TownState | None = None) -> Callable[[Recipe.BaseRecipe], float]:
+    def Cost(recipe: Recipe.BaseRecipe) -> float:
+        if isinstance(recipe.building, Buildings.CONVERTER):
+            return 0
+        buildingConfig = Catalog.catalog.GetBuildingConfig(recipe.building, state)
+        workers = buildingConfig.suppliers.get(WorkUnits.SUPPLIER.WORKER_TYPE_1, 0) + buildingConfig.suppliers.get(WorkUnits.SUPPLIER.WORKER_TYPE_2, 0)
+        return recipe.work_units / buildingConfig.work_units * workers
+    return Cost
+
+#Returns a cost function for the amount of the given base resource produced per unit of scale
+def ResourceCost(resource: NATURAL_RESOURCE) -> Callable[[Recipe.BaseRecipe], float]:
+    def Cost(recipe: Recipe.BaseRecipe) -> float:
+        return recipe.outputs.get(resource, 0)
+    return Cost
+
+######################################################################################################################################################
+# SIMPLEX
+
+#Minimises costs.x subject to rows.x >= rhs and x >= 0 using the two-phase simplex method (with Bland's rule to avoid cycling)
+#Returns x, or None if there is no feasible or bounded solution
+def Simplex(costs: list[float], rows: list[list[float]], rhs: list[float], epsilon: float = 0.000000001) -> list[float] | None:
+    structural = len(costs)
+    artificialRows = [i for i, value in enumerate(rhs) if value > 0]
+    columns = structural + len(rows) + len(artificialRows)
+
+    #Build the tableau with a surplus column per row, and an artificial column for each row that can't start with it's surplus in the basis
+    tableau: list[list[float]] = []
+    basis: list[int] = []
+    for i, (row, value) in enumerate(zip(rows, rhs)):
+        tableauRow = [0.0] * (columns + 1)
+        if value > 0:
+            tableauRow[:structural] = row
+            tableauRow[structural + i] = -1
+            artificial = structural + len(rows) + artificialRows.index(i)
+            tableauRow[artificial] = 1
+            tableauRow[columns] = value
+            basis.append(artificial)
+        else:
+            tableauRow[:structural] = [-x for x in row]
+            tableauRow[structural + i] = 1
+            tableauRow[columns] = -value
+            basis.append(structural + i)
+        tableau.append(tableauRow)
+
+    #Returns the reduced cost row for the given column costs
+    def ReducedCosts(columnCosts: list[float]) -> list[float]:
+        objective = columnCosts + [0.0]
+        for row, basic in zip(tableau, basis):
+            if columnCosts[basic] != 0:
+                factor = columnCosts[basic]
+                objective = [x - factor * y for x, y in zip(objective, row)]
+        return objective
+
+    #Pivots the given column into the basis at the given row
+    def Pivot(objective: list[float], pivotRow: int, pivotColumn: int):
+        row = tableau[pivotRow]
+        pivot = row[pivotColumn]
+        row[:] = [x / pivot for x in row]
+        for otherRow in tableau:
+            factor = otherRow[pivotColumn]
+            if otherRow is not row and factor != 0:
+                otherRow[:] = [x - factor * y for x, y in zip(otherRow, row)]
+        factor = objective[pivotColumn]
+        if factor != 0:
+            objective[:] = [x - factor * y for x, y in zip(objective, row)]
+        basis[pivotRow] = pivotColumn
+
+    #Pivots until optimal, only letting the allowed columns enter the basis
+    #Returns False if unbounded
+    def Optimise(objective: list[float], allowedColumns: int) -> bool:
+        while True:
+            pivotColumn = next((j for j in range(allowedColumns) if objective[j] < -epsilon), None)
+            if pivotColumn is None:
+                return True
+            pivotRow = None
+            for i, row in enumerate(tableau):
+                if row[pivotColumn] > epsilon:
+                    ratio = row[columns] / row[pivotColumn]
+                    if pivotRow is None or ratio < bestRatio - epsilon or (abs(ratio - bestRatio) <= epsilon and basis[i] < basis[pivotRow]):
+                        pivotRow = i
+                        bestRatio = ratio
+            if pivotRow is None:
+                return False
+            Pivot(objective, pivotRow, pivotColumn)
+
+    #Phase 1: find a feasible solution by minimising the artificial variables
+    objective = ReducedCosts([0.0] * (structural + len(rows)) + [1.0] * len(artificialRows))
+    Optimise(objective, columns)
+    if -objective[columns] > epsilon * max(1, sum(rhs)):
+        return None
+
+    #Drive any artificial variables left in the basis (at zero) out of it
+    for i in range(len(tableau) - 1, -1, -1):
+        if basis[i] >= structural + len(rows):
+            pivotColumn = next((j for j in range(structural + len(rows)) if abs(tableau[i][j]) > epsilon), None)
+            if pivotColumn is None:
+                #Redundant row
+                del tableau[i]
+                del basis[i]
+            else:
+                Pivot(objective, i, pivotColumn)
+
+    #Phase 2: minimise the real costs without letting the artificial variables back in
+    objective = ReducedCosts(costs + [0.0] * (len(rows) + len(artificialRows)))
+    if not Optimise(objective, structural + len(rows)):
+        return None
+
+    solution = [0.0] * structural
+    for row, basic in zip(tableau, basis):
+        if basic < structural:
+            solution[basic] = row[columns]
+    return solution
+
+######################################################################################################################################################
+# PLANNING
+
+#Stores the result of planning the production of an item
+class ProductionPlan():
+    #Stores the scale of each recipe in the optimal mix
+    scales: dict[Recipe.BaseRecipe, float]
+    #Stores the total cost of the optimal mix
+    cost: float
+    #Stores the cheapest production line using the chosen recipes (evaluated with the iterative solver, check it's valid)
+    line: ProductionLine.ProductionLine
+    #Stores how many fewer update cycles evaluating the line took by solving it's cycles directly (see ProductionLine.GetCyclesSaved)
+    cyclesSaved: int
+
+    def __init__(self, scales: dict[Recipe.BaseRecipe, float], cost: float, line: ProductionLine.ProductionLine) -> None:
+        self.scales = scales
+        self.cost = cost
+        self.line = line
+        self.cyclesSaved = line.GetCyclesSaved() if line.valid else 0
+
+    def __str__(self) -> str:
+        lines = [f"Cost: {self.cost}", f"Update cycles: {self.line.cycles} ({self.cyclesSaved} saved)"]
+        for recipe, scale in self.scales.items():
+            if scale > 0:
+                lines.append(f"(x{scale}){recipe}")
+        return "\n".join(lines) + "\n"
+
+#Returns every recipe that could be used to produce the given item in the given town state (the same alternatives as CreateProductionLines)
+def GetReachableRecipes(item: ITEM, state: Town.TownState | None = None) -> list[Recipe.BaseRecipe]:
+    return GetDemandRecipes([item], state)
+
+#Returns every recipe that could be used to produce any of the given items in the given town state
+def GetDemandRecipes(demandItems: list[ITEM], state: Town.TownState | None = None) -> list[Recipe.BaseRecipe]:
+    recipes: list[Recipe.BaseRecipe] = []
+    seenItems: set[ITEM] = set(demandItems)
+    nextItems: deque[ITEM] = deque(demandItems)
+    while nextItems:
+        item = nextItems.popleft()
+        for recipe in Catalog.catalog.GetPrimary(item, state):
+            recipes.append(recipe)
+            buildingResources = Catalog.catalog.GetBuildingConfig(recipe.building, state).GetItemSuppliers()
+            for consumedItem in list(recipe.inputs.keys()) + list(buildingResources.keys()):
+                if consumedItem not in seenItems:
+                    seenItems.add(consumedItem)
+                    nextItems.append(consumedItem)
+    return recipes
+
+#Returns the scale of each recipe in the cheapest mix producing the given amount of the given item
+#Uses SciPy if it's available, otherwise the built in simplex
+def SolveRecipeMix(item: ITEM, amount: float, cost: Callable[[Recipe.BaseRecipe], float], state: Town.TownState | None = None) -> tuple[dict[Recipe.BaseRecipe, float], float] | None:
+    return SolveDemandMix({item: amount}, cost, state)
+
+#Returns the scale of each recipe in the cheapest mix producing the given amount of each of the given items
+#Producers of items needed for more than one demand are shared, rather than each demand paying for it's own
+def SolveDemandMix(demands: dict[ITEM, float], cost: Callable[[Recipe.BaseRecipe], float], state: Town.TownState | None = None) -> tuple[dict[Recipe.BaseRecipe, float], float] | None:
+    recipes = GetDemandRecipes(list(demands.keys()), state)
+
+    #Net production of each item per unit of scale of each recipe (without speciality boosts)
+    items: dict[ITEM, int] = dict()
+    netProduction: list[dict[ITEM, float]] = []
+    for recipe in recipes:
+        net: dict[ITEM, float] = dict()
+        for output, quantity in recipe.outputs.items():
+            net[output] = net.get(output, 0) + quantity
+        for consumedItem, quantity in recipe.inputs.items():
+            net[consumedItem] = net.get(consumedItem, 0) - quantity
+        buildingConfig = Catalog.catalog.GetBuildingConfig(recipe.building, state)
+        if recipe.work_units > 0 and buildingConfig.work_units > 0:
+            for consumedItem, quantity in buildingConfig.GetItemSuppliers().items():
+                net[consumedItem] = net.get(consumedItem, 0) - quantity * recipe.work_units / buildingConfig.work_units
+        for netItem in net:
+            items.setdefault(netItem, len(items))
+        netProduction.append(net)
+
+    #Items nothing produces can't be supplied
+    if any(demandItem not in items for demandItem in demands):
+        return None
+
+    rows = [[0.0] * len(recipes) for _ in items]
+    for column, net in enumerate(netProduction):
+        for netItem, quantity in net.items():
+            rows[items[netItem]][column] = quantity
+    rhs = [demands.get(netItem, 0.0) for netItem in items]
+
+    #Break ties between equal cost mixes by preferring fewer buildings
+    buildingsCost = BuildingsCost(state)
+    costs = [cost(recipe) + 0.000001 * buildingsCost(recipe) for recipe in recipes]
+
+    if linprog:
+        result = linprog(costs, A_ub=[[-x for x in row] for row in rows], b_ub=[-x for x in rhs], bounds=(0, None), method="highs")
+        if result.status != 0:
+            return None
+        solution = list(result.x)
+    else:
+        solution = Simplex(costs, rows, rhs)
+        if solution is None:
+            return None
+
+    scales = {recipe: scale for recipe, scale in zip(recipes, solution)}
+    return scales, sum(cost(recipe) * scale for recipe, scale in scales.items())
+
+#Creates a production line from the given recipe mix, using the recipe chosen for each item where the mix uses more than one
+#Items without a producer in the mix are supplied as byproducts
+def CreatePlannedLine(item: ITEM, scales: dict[Recipe.BaseRecipe, float], choices: dict[ITEM, Recipe.BaseRecipe], state: Town.TownState | None = None) -> ProductionLine.ProductionLine:
+    return CreateDemandLine([item], scales, choices, state)
+
+#Creates one production line producing all of the given items from the given recipe mix, the first item is the target of the line
+#Each item gets one producer which is shared by everything consuming it
+def CreateDemandLine(demandItems: list[ITEM], scales: dict[Recipe.BaseRecipe, float], choices: dict[ITEM, Recipe.BaseRecipe], state: Town.TownState | None = None) -> ProductionLine.ProductionLine:
+    line = ProductionLine.ProductionLine(demandItems[0], state)
+    seenItems: set[ITEM] = set(demandItems)
+    nextItems: deque[ITEM] = deque(demandItems)
+    while nextItems:
+        nextItem = nextItems.popleft()
+        recipes = GetMixedRecipes(nextItem, scales)
+        if recipes:
+            recipe = choices.get(nextItem, recipes[0])
+            ProductionLine.CreateProductionLines_AddRecipe(recipe, nextItems, seenItems, line)
+    return line
+
+#Returns the primary recipes for the given item used by the recipe mix, largest scale first
+def GetMixedRecipes(item: ITEM, scales: dict[Recipe.BaseRecipe, float]) -> list[Recipe.BaseRecipe]:
+    recipes = [recipe for recipe in Recipe.manager.GetPrimary(item) if scales.get(recipe, 0) > 0.0000001]
+    return sorted(recipes, key=lambda x: scales[x], reverse=True)
+
+#Returns the total cost of the given evaluated production line
+def GetLineCost(line: ProductionLine.ProductionLine, cost: Callable[[Recipe.BaseRecipe], float]) -> float:
+    return sum(cost(recipe) * scale for recipe, scale in line.GetScales().items())
+
+#Returns the cheapest plan for producing the given amount of the given item, or None if it can't be produced
+#A production line can only have one producer per item, so where the optimal mix uses more than one the cheapest valid choice is used
+#Specialities aren't considered, the line can be specialised afterwards with ProductionLine.SpecialiseProductionLine
+#Only buildings unlocked in the given town state are used, the cost defaults to the workers needed in it (see WorkersCost)
+def PlanProductionLine(item: ITEM, amount: float = 2, cost: Callable[[Recipe.BaseRecipe], float] | None = None, maxChoices: int = 64, state: Town.TownState | None = None) -> ProductionPlan | None:
+    if cost is None:
+        cost = WorkersCost(state)
+    result = SolveRecipeMix(item, amount, cost, state)
+    if result is None:
+        return None
+    scales, totalCost = result
+
+    bestLine = CreateBestLine_Internal({item: amount}, scales, cost, maxChoices, state)
+    return ProductionPlan(scales, totalCost, bestLine)
+
+#Creates the cheapest valid production line for the given demands from the given recipe mix (or an invalid one if none are valid)
+#Each choice of producer for the items the mix uses more than one recipe for is tried (up to maxChoices of them)
+def CreateBestLine_Internal(demands: dict[ITEM, float], scales: dict[Recipe.BaseRecipe, float], cost: Callable[[Recipe.BaseRecipe], float], maxChoices: int, state: Town.TownState | None) -> ProductionLine.ProductionLine:
+    demandItems = list(demands.keys())
+    amount = demands[demandItems[0]]
+
+    mixedItems: dict[ITEM, list[Recipe.BaseRecipe]] = dict()
+    for recipe, scale in scales.items():
+        primaryOutput = next(iter(recipe.outputs))
+        if scale > 0.0000001 and primaryOutput not in mixedItems:
+            recipes = GetMixedRecipes(primaryOutput, scales)
+            if len(recipes) > 1:
+                mixedItems[primaryOutput] = recipes
+
+    bestLine: ProductionLine.ProductionLine | None = None
+    bestCost = 0
+    for choice in itertools.islice(itertools.product(*mixedItems.values()), maxChoices):
+        line = CreateDemandLine(demandItems, scales, dict(zip(mixedItems.keys(), choice)), state)
+        for demandItem in demandItems[1:]:
+            line.SetExtraOutput(demandItem, demands[demandItem] / amount)
+        line.CalculateItemData(amount)
+        if line.valid:
+            line.CalculateStats()
+            lineCost = GetLineCost(line, cost)
+            if not bestLine or not bestLine.valid or lineCost < bestCost:
+                bestLine = line
+                bestCost = lineCost
+        elif not bestLine:
+            bestLine = line
+    return bestLine
+
+######################################################################################################################################################
+# TOWN PLANNING
+
+#The suppliers counted as coins in a town plan
+COIN_SUPPLIERS = [WorkUnits.SUPPLIER.YELLOW_COIN, WorkUnits.SUPPLIER.RED_COIN, WorkUnits.SUPPLIER.BLUE_COIN, WorkUnits.SUPPLIER.PURPLE_COIN]
+
+#Stores the result of planning the production of several items at once
+#Every item is produced by one combined production line, so intermediate items needed by more than one of them share their producers
+class TownPlan(ProductionPlan):
+    #Stores the amount of each item the town needs
+    demands: dict[ITEM, float]
+    #Stores the resource nodes, producer buildings and pickaxe upkeep for the natural resources (None if the line isn't valid)
+    producers: Producers.ProducerPlan | None
+
+    #Farms use water and fertilizer if they're enabled
+    def __init__(self, demands: dict[ITEM, float], scales: dict[Recipe.BaseRecipe, float], cost: float, line: ProductionLine.ProductionLine, water: bool = False, fertilizer: bool = False) -> None:
+        super().__init__(scales, cost, line)
+        self.demands = demands
+        self.producers = line.stats.PlanProducers(water, fertilizer, line.state) if line.valid and line.stats else None
+
+    def __str__(self) -> str:
+        lines = [", ".join(f"{item}: {amount}" for item, amount in self.demands.items())]
+        if self.line.valid and self.line.stats:
+            lines.append(f"Workers: {self.GetWorkers()}, Buildings: {self.GetBuildings()}")
+            lines.append(f"Coins: {self.GetCoins()}")
+        if self.producers:
+            lines.append(str(self.producers))
+        return "\n".join(lines) + "\n" + super().__str__()
+
+    #Returns the total workers needed by the combined production line
+    def GetWorkers(self) -> float:
+        return ProductionLine.SortByWorkers(self.line)
+
+    #Returns the total buildings needed by the combined production line
+    def GetBuildings(self) -> int:
+        return ProductionLine.SortByBuildings(self.line)
+
+    #Returns the total of each coin needed by the combined production line
+    def GetCoins(self) -> dict[WorkUnits.SUPPLIER, float]:
+        return {supplier: self.line.stats.totalSuppliers[supplier] for supplier in COIN_SUPPLIERS if supplier in self.line.stats.totalSuppliers}
+
+    #Returns the base resources produced for the combined production line
+    def GetBaseResources(self) -> dict[NATURAL_RESOURCE, int]:
+        return self.line.stats.baseResources
+
+#Returns the cheapest plan for producing the given amount of every given item with one combined production line, or None if any can't be produced
+#The first item is the target of the production line, the others are extra outputs of it (see PlanProductionLine for the limitations)
+#Farms use water and fertilizer in the node counts if they're enabled
+def PlanTown(demands: dict[ITEM, float], cost: Callable[[Recipe.BaseRecipe], float] | None = None, maxChoices: int = 64, state: Town.TownState | None = None, water: bool = False, fertilizer: bool = False) -> TownPlan | None:
+    if cost is None:
+        cost = WorkersCost(state)
+    demands = {item: amount for item, amount in demands.items() if amount > 0}
+    if not demands:
+        raise ValueError("A town plan needs a positive amount of at least one item")
+
+    result = SolveDemandMix(demands, cost, state)
+    if result is None:
+        return None
+    scales, totalCost = result
+
+    bestLine = CreateBestLine_Internal(demands, scales, cost, maxChoices, state)
+    return TownPlan(demands, scales, totalCost, bestLine, water, fertilizer)
@@ -1,16 +1,25 @@
-import Recipe, WorkUnits
-import math
+import Recipe, Catalog, Town
+import functools, math
 from Buildings import *
+from Items import *
+
+#Plans the producers of the natural resources a production line consumes: the resource nodes, the producer buildings and the pickaxe upkeep of the mines
+#Rates are in the same units as the production line amounts (per second)
+
+#Rates are rounded up to a multiple of this before finding the requirements, so similar rates share the memoised requirements (and they're never underestimated)
+RATE_BUCKET_SIZE = 0.001
+#The max number of memoised requirements
+REQUIREMENTS_CACHE_SIZE = 4096
 
 class ResourceNode():
     def __init__(self, grow_time_s: int, default_yield: int):
         self.grow_time_s = grow_time_s
         self.default_yield = default_yield
     
-    def GetTotalYield() -> int:
+    def GetTotalYield(self) -> int:
         raise NotImplementedError()
     
-    def GetConsumptionRequirements(self, consumption_per_s: int) -> dict[str, float]:
+    def GetConsumptionRequirements(self, consumption_per_s: float) -> dict[str, float]:
         data = {}
         yield_lasts_s = self.GetTotalYield() / consumption_per_s
         data["nodes_needed"] = 1 + self.grow_time_s / yield_lasts_s
@@ -24,7 +33,7 @@ class MineResourceNode(ResourceNode):
         #Default + 400% from pickaxes
         return self.default_yield * 5
     
-    def GetConsumptionRequirements(self, consumption_per_s: int) -> dict[str, float]:
+    def GetConsumptionRequirements(self, consumption_per_s: float) -> dict[str, float]:
         data = {}
         yield_lasts_s = self.GetTotalYield() / consumption_per_s
         data["nodes_needed"] = 1 + self.grow_time_s / yield_lasts_s
@@ -58,52 +67,111 @@ class FarmResourceNode(ResourceNode):
         return (1 + self.farm_tile + self.water + self.fertilizer) * self.default_yield * self.affinity
 
 #Virtual producer class
+#Producers without a resource node (node is None) only need buildings
 class VirtualProducer():
-    node: ResourceNode
-    def __init__(self, type: BUILDING, recipe: Recipe.BaseRecipe):
+    node: ResourceNode | None
+    def __init__(self, type: BUILDING, recipe: Recipe.BaseRecipe, state: Town.TownState | None = None):
         self.type = type
         self.recipe = recipe
+        self.state = state
+        self.node = None
     
-    def GetConsumptionRequirements(self, consumption_per_s: int) -> dict[str, float|int]:
-        data = self.node.GetConsumptionRequirements(consumption_per_s)
-        total_work = consumption_per_s * self.recipe.work_units
-        data["building_needed"] = math.ceil(total_work / WorkUnits.GetMaxConfig(self.type)["work_units"])
-        data["work_per"] = total_work / data["building_needed"]
+    def GetConsumptionRequirements(self, consumption_per_s: float) -> dict[str, float|int]:
+        data = self.node.GetConsumptionRequirements(consumption_per_s) if self.node else {}
+        #The recipe can produce more than one of the resource per craft
+        total_work = consumption_per_s / self.recipe.outputs[next(iter(self.recipe.outputs))] * self.recipe.work_units
+        data["building_needed"] = math.ceil(total_work / Catalog.catalog.GetBuildingConfig(self.type, self.state).work_units - 0.000000001)
+        data["work_per"] = total_work / data["building_needed"] if data["building_needed"] > 0 else 0
         return data
 
 class Mine(VirtualProducer):
-    def __init__(self, recipe: Recipe.BaseRecipe):
-        VirtualProducer.__init__(self, PRODUCER.MINE, recipe)
+    def __init__(self, recipe: Recipe.BaseRecipe, state: Town.TownState | None = None):
+        VirtualProducer.__init__(self, PRODUCER.MINE, recipe, state)
         self.node = MineResourceNode()
 
 class Forestor(VirtualProducer):
-    def __init__(self, recipe: Recipe.BaseRecipe):
-        VirtualProducer.__init__(self, PRODUCER.FORESTER, recipe)
+    def __init__(self, recipe: Recipe.BaseRecipe, state: Town.TownState | None = None):
+        VirtualProducer.__init__(self, PRODUCER.FORESTER, recipe, state)
         outputs = list(recipe.outputs.keys())
         if len(outputs) != 1:
             raise ValueError("Expected a single output")
-        self.node = ForestorResourceNode(outputs[0])
+        self.node = ForestorResourceNode(outputs[0].name)
 
 class Farm(VirtualProducer):
-    def __init__(self, recipe: Recipe.BaseRecipe):
-        VirtualProducer.__init__(self, PRODUCER.FARM, recipe)
+    def __init__(self, recipe: Recipe.BaseRecipe, water: bool = False, fertilizer: bool = False, state: Town.TownState | None = None):
+        VirtualProducer.__init__(self, PRODUCER.FARM, recipe, state)
         outputs = list(recipe.outputs.keys())
         if len(outputs) != 1:
             raise ValueError("Expected a single output")
-        self.node = FarmResourceNode(outputs[0])
+        self.node = FarmResourceNode(outputs[0].name, water, fertilizer)
+
+#There is no resource node data for fisheries yet, so they only need buildings
+class Fishery(VirtualProducer):
+    def __init__(self, recipe: Recipe.BaseRecipe, state: Town.TownState | None = None):
+        VirtualProducer.__init__(self, PRODUCER.FISHERY, recipe, state)
 
 #Returns the producer type and recipe
-def GetProducer(output: str) -> VirtualProducer:
-    recipes = Recipe.manager.Get(output)
+#The water and fertilizer options are only used by farms
+def GetProducer(output: NATURAL_RESOURCE, water: bool = False, fertilizer: bool = False, state: Town.TownState | None = None) -> VirtualProducer:
+    recipes = Recipe.manager.GetPrimary(output)
     if len(recipes) != 1:
         raise ValueError("Expected a single recipe")
     recipe = recipes[0]
 
     if recipe.building == PRODUCER.MINE:
-        return Mine(recipe.recipe)
+        return Mine(recipe, state)
     elif recipe.building == PRODUCER.FORESTER:
-        return Forestor(recipe.recipe)
+        return Forestor(recipe, state)
     elif recipe.building == PRODUCER.FARM:
-        return Farm(recipe.recipe)
+        return Farm(recipe, water, fertilizer, state)
+    elif recipe.building == PRODUCER.FISHERY:
+        return Fishery(recipe, state)
     else:
-        raise ValueError("No producer for the given output")
\ No newline at end of file
+        raise ValueError("No producer for the given output")
+
+######################################################################################################################################################
+# PLANNING
+
+#Returns the requirements for producing the given resource at the given rate bucket (see RATE_BUCKET_SIZE), memoised
+#Shared between every call, so plans store a copy of it
+@functools.lru_cache(maxsize=REQUIREMENTS_CACHE_SIZE)
+def GetRequirements(resource: NATURAL_RESOURCE, rateBucket: int, water: bool, fertilizer: bool, state: Town.TownState | None) -> dict[str, float|int]:
+    return GetProducer(resource, water, fertilizer, state).GetConsumptionRequirements(rateBucket * RATE_BUCKET_SIZE)
+
+#Stores the producers needed for the natural resources of a production line
+class ProducerPlan():
+    #Stores the requirements of each natural resource ("nodes_needed", "building_needed", "work_per" and "pickaxes/sec" for mines)
+    requirements: dict[NATURAL_RESOURCE, dict[str, float|int]]
+
+    def __init__(self) -> None:
+        self.requirements = dict()
+
+    def __str__(self) -> str:
+        lines = [f"Nodes: {self.GetTotalNodes()}, Producer buildings: {self.GetTotalBuildings()}, Pickaxes/sec: {self.GetPickaxeUpkeep()}"]
+        for resource, data in self.requirements.items():
+            lines.append(f"{resource}: {data}")
+        return "\n".join(lines) + "\n"
+
+    #Returns the total number of resource nodes needed (rounded up for each resource)
+    def GetTotalNodes(self) -> int:
+        return sum(math.ceil(data["nodes_needed"]) for data in self.requirements.values() if "nodes_needed" in data)
+
+    #Returns the total number of producer buildings needed
+    def GetTotalBuildings(self) -> int:
+        return sum(data["building_needed"] for data in self.requirements.values())
+
+    #Returns the pickaxes per second used by the mines
+    def GetPickaxeUpkeep(self) -> float:
+        return sum(data.get("pickaxes/sec", 0) for data in self.requirements.values())
+
+#Returns the producers needed for the given rate of each natural resource (like ProductionStats.baseResources) in one pass
+#Resources which aren't consumed are skipped, farms use water and fertilizer if they're enabled
+def PlanProducers(baseResources: dict[NATURAL_RESOURCE, float], water: bool = False, fertilizer: bool = False, state: Town.TownState | None = None) -> ProducerPlan:
+    plan = ProducerPlan()
+    for resource, rate in baseResources.items():
+        if rate <= 0:
+            continue
+        #Ignore rounding errors so exact rates don't need the next bucket
+        rateBucket = math.ceil(rate / RATE_BUCKET_SIZE - 0.000001)
+        plan.requirements[resource] = dict(GetRequirements(resource, rateBucket, water, fertilizer, state))
+    return plan
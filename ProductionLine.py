@@ -1,12 +1,19 @@
-import Recipe, WorkUnits, Buildings, Speciality
+import Recipe, WorkUnits, Buildings, Speciality, Catalog, Town, Graph, Producers, Metrics, Trace
 from Items import *
 from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
-import math
-from typing import TypeVar
+import bisect, gzip, itertools, json, math, os, time
+from enum import Enum
+from typing import Any, Callable, Iterable, Iterator
+
+#The solvers which can be used to calculate item data
+SOLVER = Enum('SOLVER', ['ITERATIVE', 'LINEAR'])
 
 #Stores relations (producers and consumers) for a given item in a production line
 class ItemRelations():
+    __slots__ = ("item", "primaryProducer", "secondaryProducers", "consumers", "owner")
+
     item: ITEM
 
     #Stores the recipe which is the primary producer for this item
@@ -17,14 +24,18 @@ class ItemRelations():
     #Stores recipes consuming this item
     consumers: list[Recipe.BaseRecipe]
 
-    def __init__(self, item: ITEM) -> None:
+    #Stores the ownership token of the production line allowed to change these relations (copy on write)
+    owner: object | None
+
+    def __init__(self, item: ITEM, owner: object | None = None) -> None:
         self.item = item
         self.primaryProducer = None
         self.secondaryProducers = []
         self.consumers = []
+        self.owner = owner
     
-    def copy(self):
-        obj = ItemRelations(self.item)
+    def copy(self, owner: object | None = None):
+        obj = ItemRelations(self.item, owner)
         obj.primaryProducer = self.primaryProducer
         obj.secondaryProducers = self.secondaryProducers.copy()
         obj.consumers = self.consumers.copy()
@@ -36,22 +47,32 @@ class ItemRelations():
             producers.append(self.primaryProducer)
         return producers
 
+#The number of cycles of required diff history kept for each item (IsDiverging only looks at the last 6)
+HISTORY_SIZE = 8
+#Producers don't update for changes of 0.0000001 or less (see UpdateItem), so the requirement changes of a converging cycle can stop decreasing once they're that small
+#Changes up to this size aren't checked for divergence
+DIVERGENCE_TOLERANCE = 0.000001
+
 class ItemProductionData():
+    __slots__ = ("item", "consumerRequires", "required", "requiredDiffHistory", "historyLength", "producerAchieved", "achieved", "circularDepth")
+
     item: ITEM
 
     #Stores the amount of this item required by each consumer (a recipe or None for outputs from the production line)
     consumerRequires: dict[None | Recipe.BaseRecipe, float]
     #Stores the total amount of this item required
     required: float
-    #Stores history of changes to toal required
+    #Stores history of changes to toal required, as a ring buffer of the last HISTORY_SIZE cycles (cycle % HISTORY_SIZE)
     requiredDiffHistory: list[float]
+    #Stores the number of cycles of history there has been
+    historyLength: int
 
     #Stores the amount of this item achieved by each producer
     producerAchieved: dict[Recipe.BaseRecipe, float]
     #Stores the total amount of this item produced
     achieved: float
 
-    #Stores the circular depth of this item
+    #Stores the cycle the requirement history is checked for divergence from (the requirements before it are out of sync)
     circularDepth: int
 
     def __init__(self, item: ITEM, circularDepth: int) -> None:
@@ -59,7 +80,8 @@ class ItemProductionData():
 
         self.consumerRequires = {}
         self.required = 0
-        self.requiredDiffHistory = []
+        self.requiredDiffHistory = [0] * HISTORY_SIZE
+        self.historyLength = 0
         self.producerAchieved = {}
         self.achieved = 0
 
@@ -69,6 +91,25 @@ class ItemProductionData():
         result = f"{self.item} = {self.achieved}"
         return result
     
+    #Returns the consumers and producers as a dict of names and recipe ids ("" for outputs from the production line)
+    def ToDict(self) -> dict[str, Any]:
+        return {
+            "consumerRequires": {recipe.id if recipe else "": quantity for recipe, quantity in self.consumerRequires.items()},
+            "producerAchieved": {recipe.id: quantity for recipe, quantity in self.producerAchieved.items()}
+        }
+    
+    #Creates the item production data from the result of ToDict
+    @staticmethod
+    def FromDict(item: ITEM, data: dict[str, Any]):
+        obj = ItemProductionData(item, 0)
+        for id, quantity in data["consumerRequires"].items():
+            obj.consumerRequires[Recipe.GetRecipe(id) if id else None] = quantity
+            obj.required += quantity
+        for id, quantity in data["producerAchieved"].items():
+            obj.producerAchieved[Recipe.GetRecipe(id)] = quantity
+            obj.achieved += quantity
+        return obj
+    
     #Sets the amount of this item consumed by the given consumer (recipe or None for outputs from the production line)
     def SetConsumption(self, cycle: int, quantity: float, recipe: Recipe.BaseRecipe | None):
         diff = quantity
@@ -77,13 +118,14 @@ class ItemProductionData():
         else:
             self.consumerRequires[recipe] = 0
         
-        while len(self.requiredDiffHistory) <= cycle:
-            self.requiredDiffHistory.append(0)
+        while self.historyLength <= cycle:
+            self.requiredDiffHistory[self.historyLength % HISTORY_SIZE] = 0
+            self.historyLength += 1
             
-        if len(self.requiredDiffHistory) == cycle + 1:
-            self.requiredDiffHistory[cycle] += diff
+        if self.historyLength == cycle + 1:
+            self.requiredDiffHistory[cycle % HISTORY_SIZE] += diff
         else:
-            raise ValueError(f"Tried to set consumption with cycle {cycle} when required diff history length was {len(self.requiredDiffHistory)}")
+            raise ValueError(f"Tried to set consumption with cycle {cycle} when required diff history length was {self.historyLength}")
 
         self.consumerRequires[recipe] += diff
         self.required += diff
@@ -101,14 +143,15 @@ class ItemProductionData():
     
     #Returns whether the requirement history shows divergence
     def IsDiverging(self):
-        #Requirements are out of sync by circular depth cycles
-        #Wait that many cycles before checking for divergence
-        
-        indexA = len(self.requiredDiffHistory) - 1
+        #Requirements are out of sync until the circular depth cycle
+        #Wait until then before checking for divergence
+        #Tiny changes aren't checked (see DIVERGENCE_TOLERANCE)
+        indexA = self.historyLength - 1
         indexB = indexA - 1
         count = 0
         while indexB >= self.circularDepth and count < 5:
-            if self.requiredDiffHistory[indexA] >= self.requiredDiffHistory[indexB]:
+            diffA = self.requiredDiffHistory[indexA % HISTORY_SIZE]
+            if diffA >= self.requiredDiffHistory[indexB % HISTORY_SIZE] and diffA > DIVERGENCE_TOLERANCE:
                 return True
             count += 1
             indexA -= 1
@@ -120,9 +163,32 @@ class ItemProductionData():
     def IsSatisfied(self):
         return self.achieved >= self.required
 
+#Solves matrix.x = vector with Gaussian elimination (partial pivoting), returns None if the matrix is singular
+#Only used for the small systems of a single cycle, so it doesn't need NumPy
+def SolveLinearSystem(matrix: list[list[float]], vector: list[float]) -> list[float] | None:
+    size = len(vector)
+    rows = [row + [value] for row, value in zip(matrix, vector)]
+    for column in range(size):
+        pivot = max(range(column, size), key=lambda x: abs(rows[x][column]))
+        if abs(rows[pivot][column]) < 0.000000001:
+            return None
+        rows[column], rows[pivot] = rows[pivot], rows[column]
+        for row in rows[column + 1:]:
+            factor = row[column] / rows[column][column]
+            if factor != 0:
+                for i in range(column, size + 1):
+                    row[i] -= factor * rows[column][i]
+    
+    solution = [0.0] * size
+    for column in reversed(range(size)):
+        solution[column] = (rows[column][size] - sum(rows[column][i] * solution[i] for i in range(column + 1, size))) / rows[column][column]
+    return solution
+
 ######################################################################################################################################################
 
 class ProductionStats():
+    __slots__ = ("buildingsPerRecipe", "suppliersPerRecipe", "totalSuppliers", "wasteItems", "overproduced", "baseResources")
+
     #Number of buildings for each recipe
     buildingsPerRecipe: dict[Recipe.BaseRecipe, int]
     #Number of each work unit suppliers for each recipe
@@ -144,37 +210,68 @@ class ProductionStats():
         self.overproduced = dict()
         self.baseResources = dict()
     
+    #Parts are joined at the end rather than added to the string one at a time
     def __str__(self) -> str:
-        result = "Supplies: ("
+        result = ["Supplies: ("]
         workers = 0
         if WorkUnits.SUPPLIER.WORKER_TYPE_1 in self.totalSuppliers:
             workers += self.totalSuppliers[WorkUnits.SUPPLIER.WORKER_TYPE_1]
         if WorkUnits.SUPPLIER.WORKER_TYPE_2 in self.totalSuppliers:
             workers += self.totalSuppliers[WorkUnits.SUPPLIER.WORKER_TYPE_2]
         if workers > 0:
-            result += f"Workers: {workers}, "
+            result.append(f"Workers: {workers}, ")
         for supplier, amount in self.totalSuppliers.items():
             if supplier != WorkUnits.SUPPLIER.WORKER_TYPE_1 and supplier != WorkUnits.SUPPLIER.WORKER_TYPE_2:
-                result += f"{supplier}: {amount}, "
-        result += ")\nWaste: ("
-        for item, amount in self.wasteItems.items():
-            result += f"{item}: {amount}, "
-        result += ")\nOverproduced: ("
-        for item, amount in self.overproduced.items():
-            result += f"{item}: {amount}, "
-        result += ")\nBase Resources: ("
-        for item, amount in self.baseResources.items():
-            result += f"{item}: {amount}, "
-        result += ")\n"
-        return result
+                result.append(f"{supplier}: {amount}, ")
+        result.append(")\nWaste: (")
+        result.extend(f"{item}: {amount}, " for item, amount in self.wasteItems.items())
+        result.append(")\nOverproduced: (")
+        result.extend(f"{item}: {amount}, " for item, amount in self.overproduced.items())
+        result.append(")\nBase Resources: (")
+        result.extend(f"{item}: {amount}, " for item, amount in self.baseResources.items())
+        result.append(")\n")
+        return "".join(result)
+    
+    #Returns the resource nodes, producer buildings and pickaxe upkeep needed for the base resources (see Producers.PlanProducers)
+    def PlanProducers(self, water: bool = False, fertilizer: bool = False, state: Town.TownState | None = None) -> Producers.ProducerPlan:
+        return Producers.PlanProducers(self.baseResources, water, fertilizer, state)
+    
+    #Returns the stats as a dict of names and recipe ids
+    def ToDict(self) -> dict[str, Any]:
+        return {
+            "buildingsPerRecipe": {recipe.id: count for recipe, count in self.buildingsPerRecipe.items()},
+            "suppliersPerRecipe": {recipe.id: {supplier.name: amount for supplier, amount in suppliers.items()} for recipe, suppliers in self.suppliersPerRecipe.items()},
+            "totalSuppliers": {supplier.name: amount for supplier, amount in self.totalSuppliers.items()},
+            "wasteItems": {item.name: amount for item, amount in self.wasteItems.items()},
+            "overproduced": {item.name: amount for item, amount in self.overproduced.items()},
+            "baseResources": {item.name: amount for item, amount in self.baseResources.items()}
+        }
+    
+    #Creates the stats from the result of ToDict
+    @staticmethod
+    def FromDict(data: dict[str, Any]):
+        obj = ProductionStats()
+        obj.buildingsPerRecipe = {Recipe.GetRecipe(id): count for id, count in data["buildingsPerRecipe"].items()}
+        obj.suppliersPerRecipe = {Recipe.GetRecipe(id): {WorkUnits.SUPPLIER[name]: amount for name, amount in suppliers.items()} for id, suppliers in data["suppliersPerRecipe"].items()}
+        obj.totalSuppliers = {WorkUnits.SUPPLIER[name]: amount for name, amount in data["totalSuppliers"].items()}
+        obj.wasteItems = {GetItem(name): amount for name, amount in data["wasteItems"].items()}
+        obj.overproduced = {GetItem(name): amount for name, amount in data["overproduced"].items()}
+        obj.baseResources = {GetItem(name): amount for name, amount in data["baseResources"].items()}
+        return obj
 
 ######################################################################################################################################################
 
+#The containers of a production line which are shared between copies until they're changed
+SHARED_CONTAINERS = ["recipes", "buildingConfigs", "recipeSpecialities", "itemRelations"]
+
 class ProductionLine():
     target: ITEM
     recipes: list[Recipe.BaseRecipe]
     group_id: int
 
+    #Stores the town state (happiness, town levels and unlocked buildings) the production line is for
+    state: Town.TownState
+
     #Stores the work unit building configs of each building
     buildingConfigs: dict[Buildings.BUILDING, WorkUnits.BuildingConfig]
     #Stores the speciality each recipe is using
@@ -182,37 +279,162 @@ class ProductionLine():
     
     #Stores the item relations for each item
     itemRelations: dict[ITEM, ItemRelations]
+    #Stores the update order of the items (None until it's needed, reset when the recipes or building configs change)
+    #Shared with copies, it's replaced rather than changed, specialities don't change it so every speciality variant shares it
+    updateOrder: list[tuple[list[ITEM], bool]] | None
 
     #Maps from each item to the ItemProductionData class
     itemData: dict[ITEM, ItemProductionData]
 
     #Stores whether this production chain is valid
     valid: bool
+    #Stores why the item data made the production line invalid (None if it didn't)
+    invalidReason: str | None
+    #Stores the number of update cycles the iterative solver used to calculate the item data
+    cycles: int
 
     #Stores stats about this production chain
     stats: ProductionStats | None
 
-    def __init__(self, target: ITEM) -> None:
+    #Stores whether every output uses it's best speciality boost (used when calculating lower bounds)
+    optimistic: bool
+
+    #Stores the amount of each other item output from the production line per one of the target item (shared with copies, it's replaced rather than changed)
+    extraOutputs: dict[ITEM, float]
+
+    #Stores the scale of each recipe to produce one of the target item (None until ScaleTo is used, reset when the line changes)
+    unitScales: dict[Recipe.BaseRecipe, float] | None
+
+    #Stores the containers (by attribute name) shared with copies of this production line, they're copied before being changed
+    sharedContainers: set[str]
+    #Stores the token marking the item relations this production line can change, the others may be shared with copies and are copied before being changed
+    ownerToken: object
+
+    #Uses the default town state if none is given
+    def __init__(self, target: ITEM, state: Town.TownState | None = None) -> None:
         self.target = target
         self.recipes = []
         self.group_id = -1
+        self.state = Town.defaultState if state is None else state
         self.buildingConfigs = dict()
         self.recipeSpecialities = dict()
         self.itemRelations = dict()
+        self.updateOrder = None
         self.itemData = dict()
         self.valid = True
+        self.invalidReason = None
+        self.cycles = 0
         self.stats = None
+        self.optimistic = False
+        self.extraOutputs = dict()
+        self.unitScales = None
+        self.sharedContainers = set()
+        self.ownerToken = object()
     
+    #Copies are copy on write, the containers and item relations are shared until one of the lines changes them
+    #So branching only costs the changes made afterwards rather than the size of the line
     def copy(self):
-        obj = ProductionLine(self.target)
-        obj.recipes = self.recipes.copy()
+        if Metrics.metrics is not None:
+            Metrics.metrics.Count("copies")
+        obj = ProductionLine(self.target, self.state)
+        obj.recipes = self.recipes
         obj.group_id = self.group_id
-        obj.buildingConfigs = self.buildingConfigs.copy()
-        obj.recipeSpecialities = self.recipeSpecialities.copy()
-        for item, relation in self.itemRelations.items():
-            obj.itemRelations[item] = relation.copy()
+        obj.buildingConfigs = self.buildingConfigs
+        obj.recipeSpecialities = self.recipeSpecialities
+        obj.itemRelations = self.itemRelations
+        obj.updateOrder = self.updateOrder
         obj.itemData = self.itemData.copy()
         obj.valid = self.valid
+        obj.invalidReason = self.invalidReason
+        obj.cycles = self.cycles
+        obj.optimistic = self.optimistic
+        obj.extraOutputs = self.extraOutputs
+        obj.unitScales = self.unitScales
+
+        #Neither line owns the shared item relations anymore
+        self.sharedContainers = set(SHARED_CONTAINERS)
+        self.ownerToken = object()
+        obj.sharedContainers = set(SHARED_CONTAINERS)
+        return obj
+    
+    #Makes sure the given container (by attribute name) isn't shared with any copies before it's changed
+    def OwnContainer(self, name: str):
+        if name in self.sharedContainers:
+            setattr(self, name, getattr(self, name).copy())
+            self.sharedContainers.remove(name)
+    
+    #Returns the relations for the given item, making sure they aren't shared with any copies so they can be changed
+    def GetOwnedRelations(self, item: ITEM) -> ItemRelations:
+        self.OwnContainer("itemRelations")
+        relations = self.itemRelations.get(item)
+        if relations is None:
+            relations = ItemRelations(item, self.ownerToken)
+            self.itemRelations[item] = relations
+        elif relations.owner is not self.ownerToken:
+            relations = relations.copy(self.ownerToken)
+            self.itemRelations[item] = relations
+        return relations
+    
+    #Sets the work unit building config used for the given building
+    def SetBuildingConfig(self, building: Buildings.BUILDING, buildingConfig: WorkUnits.BuildingConfig):
+        self.OwnContainer("buildingConfigs")
+        self.buildingConfigs[building] = buildingConfig
+        self.unitScales = None
+        self.updateOrder = None
+    
+    #Sets the speciality used by the given recipe
+    def SetSpeciality(self, recipe: Recipe.BaseRecipe, speciality: Speciality.SPECIALITY):
+        self.OwnContainer("recipeSpecialities")
+        self.recipeSpecialities[recipe] = speciality
+        self.unitScales = None
+    
+    #Sets the amount of the given item output from the production line per one of the target item
+    def SetExtraOutput(self, item: ITEM, ratio: float):
+        if item == self.target:
+            raise ValueError("The target item can't be an extra output")
+        if item not in self.itemRelations:
+            raise ValueError(f"{item} isn't in the production line")
+        self.extraOutputs = self.extraOutputs | {item: ratio}
+        self.unitScales = None
+    
+    #Returns the amount of each item output from the production line when producing the given amount of the target item
+    def GetOutputs(self, amount: float) -> dict[ITEM, float]:
+        outputs = {self.target: amount}
+        for item, ratio in self.extraOutputs.items():
+            outputs[item] = amount * ratio
+        return outputs
+    
+    #Returns a compact version of the production line, made of names and recipe ids so it can be saved as JSON
+    #Recipes are pickled as their ids too, so pickle can also be used
+    def ToDict(self) -> dict[str, Any]:
+        return {
+            "target": self.target.name,
+            "state": self.state.ToDict(),
+            "recipes": [recipe.id for recipe in self.recipes],
+            "group_id": self.group_id,
+            "recipeSpecialities": {recipe.id: speciality.name for recipe, speciality in self.recipeSpecialities.items()},
+            "itemData": {item.name: itemData.ToDict() for item, itemData in self.itemData.items()},
+            "valid": self.valid,
+            "invalidReason": self.invalidReason,
+            "stats": self.stats.ToDict() if self.stats else None,
+            "optimistic": self.optimistic,
+            "extraOutputs": {item.name: ratio for item, ratio in self.extraOutputs.items()}
+        }
+    
+    #Creates a production line from the result of ToDict, using the recipes in Recipe.manager
+    @staticmethod
+    def FromDict(data: dict[str, Any]):
+        obj = ProductionLine(GetItem(data["target"]), Town.TownState.FromDict(data["state"]) if data.get("state") else None)
+        for id in data["recipes"]:
+            obj.AddRecipe(Recipe.GetRecipe(id))
+        obj.group_id = data["group_id"]
+        obj.recipeSpecialities = {Recipe.GetRecipe(id): Speciality.SPECIALITY[name] for id, name in data["recipeSpecialities"].items()}
+        obj.itemData = {GetItem(name): ItemProductionData.FromDict(GetItem(name), itemData) for name, itemData in data["itemData"].items()}
+        obj.valid = data["valid"]
+        obj.invalidReason = data.get("invalidReason")
+        obj.stats = ProductionStats.FromDict(data["stats"]) if data["stats"] else None
+        obj.optimistic = data["optimistic"]
+        obj.extraOutputs = {GetItem(name): ratio for name, ratio in data.get("extraOutputs", dict()).items()}
         return obj
     
     def HasRecipe(self, recipe: Recipe.BaseRecipe) -> bool:
@@ -221,9 +443,12 @@ class ProductionLine():
     #Returns all the inputs and resources for the given recipe
     def GetInputsAndResource(self, recipe: Recipe.BaseRecipe) -> set[ITEM]:
         if recipe.building not in self.buildingConfigs:
-            self.buildingConfigs[recipe.building] = WorkUnits.BuildingConfig(recipe.building)
+            self.SetBuildingConfig(recipe.building, Catalog.catalog.GetBuildingConfig(recipe.building, self.state))
         
-        return set(recipe.inputs.keys()).union(self.buildingConfigs[recipe.building].GetItemSuppliers().keys())
+        buildingConfig = self.buildingConfigs[recipe.building]
+        if buildingConfig is Catalog.catalog.GetBuildingConfig(recipe.building, self.state):
+            return Catalog.catalog.GetInputsAndResource(recipe)
+        return set(recipe.inputs.keys()).union(buildingConfig.GetItemSuppliers().keys())
     
     #Adds the given recipe to the production line
     #Returns a list of the input items and building resources
@@ -232,32 +457,29 @@ class ProductionLine():
         if recipe in self.recipes:
             raise ValueError("Recipe already exists")
         
+        self.OwnContainer("recipes")
         self.recipes.append(recipe)
+        self.unitScales = None
+        self.updateOrder = None
 
         primaryOutput = next(iter(recipe.outputs))
 
         if recipe.building not in self.buildingConfigs:
-            self.buildingConfigs[recipe.building] = WorkUnits.BuildingConfig(recipe.building)
+            self.SetBuildingConfig(recipe.building, Catalog.catalog.GetBuildingConfig(recipe.building, self.state))
 
         #Set items primary producer
-        if primaryOutput not in self.itemRelations:
-            self.itemRelations[primaryOutput] = ItemRelations(primaryOutput)
-        self.itemRelations[primaryOutput].primaryProducer = recipe
+        self.GetOwnedRelations(primaryOutput).primaryProducer = recipe
 
         #Set as secondary producer for other output items
         for item in list(recipe.outputs.keys()):
             if item == primaryOutput:
                 continue
-            if item not in self.itemRelations:
-                self.itemRelations[item] = ItemRelations(item)
-            self.itemRelations[item].secondaryProducers.append(recipe)
+            self.GetOwnedRelations(item).secondaryProducers.append(recipe)
 
         inputsAndResources = self.GetInputsAndResource(recipe)
         #Set as consumer for input items and resources
         for item in inputsAndResources:
-            if item not in self.itemRelations:
-                self.itemRelations[item] = ItemRelations(item)
-            self.itemRelations[item].consumers.append(recipe)
+            self.GetOwnedRelations(item).consumers.append(recipe)
         
         #Returns input items (including building resources)
         return inputsAndResources
@@ -276,113 +498,68 @@ class ProductionLine():
             
         return True
 
+    #Parts are joined at the end rather than added to the string one at a time
     def __str__(self) -> str:
-        result = f"{self.target} - Group ID: {self.group_id}\n"
+        result = [f"{self.target} - Group ID: {self.group_id}\n"]
         for recipe in self.recipes:
             if recipe in self.recipeSpecialities:
-                result += f"{self.recipeSpecialities[recipe]}, "
+                result.append(f"{self.recipeSpecialities[recipe]}, ")
             if self.stats and recipe in self.stats.buildingsPerRecipe:
-                result += f"(x{self.stats.buildingsPerRecipe[recipe]})"
-            result += f"{recipe}\n"
-        for itemData in list(self.itemData.values()):
-            result += f"{itemData}\n"
+                result.append(f"(x{self.stats.buildingsPerRecipe[recipe]})")
+            result.append(f"{recipe}\n")
+        result.extend(f"{itemData}\n" for itemData in self.itemData.values())
         if self.stats:
-            result += f"{self.stats}"
-        return result
+            result.append(f"{self.stats}")
+        return "".join(result)
     
-    #Returns the speciality boost for the given item
+    #Returns the speciality boost for the given item at the town level of the speciality
     def GetSpecialityBoost(self, item: ITEM, recipe: Recipe.BaseRecipe) -> float:
-        boost = 1
+        if self.optimistic:
+            return self.GetBestSpecialityBoost(item, recipe)
         if recipe in self.recipeSpecialities:
             speciality = self.recipeSpecialities[recipe]
-            if speciality in Speciality.GetSpecialities(item, recipe.building):
-                boost = Speciality.GetProductionBoost(speciality, 10)
-        return boost
-    
-    #Calculates and returns the depth of each recipe
-    def CalculateRecipeDepth(self) -> dict[Recipe.BaseRecipe, int]:
-        recipeDepth: dict[Recipe.BaseRecipe, int] = dict()
-        #Returns the percentage of the output consumers with a depth set
-        def GetDepthPercentage(recipe: Recipe.BaseRecipe) -> float:
-            if recipe == self.itemRelations[self.target].primaryProducer: # Always want the target item primary producer to be first
-                return 2
-            totalConsumer = 0
-            consumerWithDepth = 0
-            seenRecipe: set[Recipe.BaseRecipe] = set() # Don't count a recipe multiple times for multiple items
-            for output in list(recipe.outputs.keys()):
-                for consumer in self.itemRelations[output].consumers:
-                    if not consumer in seenRecipe:
-                        seenRecipe.add(consumer)
-                        totalConsumer += 1
-                        if consumer in recipeDepth:
-                            consumerWithDepth += 1
-            if totalConsumer == 0:
-                return 1
-            return consumerWithDepth / totalConsumer
-
-        nextRecipes: list[Recipe.BaseRecipe] = self.recipes.copy()
-        while nextRecipes:
-            #Sort recipes by percentage of output consumers with a depth set
-            nextRecipes = sorted(nextRecipes, key=lambda x: GetDepthPercentage(x), reverse=True)
-
-            recipe = nextRecipes.pop(0)
-            #Find the max depth of the output consumers
-            maxDepthOfOutputConsumers = -1
-            for output in list(recipe.outputs.keys()):
-                for consumer in self.itemRelations[output].consumers:
-                    if consumer in recipeDepth:
-                        maxDepthOfOutputConsumers = max(maxDepthOfOutputConsumers, recipeDepth[consumer])
-            
-            #Recipe depth is max of output consumers + 1
-            #If there are no output consumers this will give 0
-            recipeDepth[recipe] = maxDepthOfOutputConsumers + 1
-        
-        return recipeDepth
+            return Catalog.catalog.GetSpecialityBoost(recipe, item, speciality, self.state.GetTownLevel(speciality))
+        return 1
     
-    #Calculates and returns the depth of each item
-    def CalculateItemDepth(self, recipeDepth: dict[Recipe.BaseRecipe, int]) -> dict[ITEM, int]:
-        itemDepth: dict[ITEM, int] = dict()
-        
-        #Item depth = Max depth of their producers
-        for item, relation in self.itemRelations.items():
-            maxDepthOfProducers = -1
-            for producer in relation.GetAllProducers():
-                maxDepthOfProducers = max(maxDepthOfProducers, recipeDepth[producer])
-            itemDepth[item] = maxDepthOfProducers
-        
-        return itemDepth
-    
-    #Returns which items are circular (where the item depth is less than one of it's consumers depth)
-    def GetCircularItems(self, recipeDepth: dict[Recipe.BaseRecipe, int], itemDepth: dict[ITEM, int]) -> set[ITEM]:
-        circularItems: set[ITEM] = set()
-        for item, depth in itemDepth.items():
-            for consumer in self.itemRelations[item].consumers:
-                if depth < recipeDepth[consumer]:
-                    circularItems.add(item)
-                    break
-        return circularItems
-    
-    #Calculates and returns the circular depth of each item
-    def CalculateCircularDepth(self, circularItems: set[ITEM]) -> dict[ITEM, int]:
-        circularDepth: dict[ITEM, int] = dict()
-        for item in list(self.itemRelations.keys()):
-            circularDepth[item] = 0
-        #For each circular item, traverse the chain down through it's producers
-        #Increment the circular depth of each item as we traverse
-        #Visiting each item only once per circular item
-        for startItem in circularItems:
-            seenItems: set[ITEM] = set([startItem])
-            nextItems: deque[ITEM] = deque([startItem])
-            while nextItems:
-                item = nextItems.popleft()
-                circularDepth[item] += 1
-                for producer in self.itemRelations[item].GetAllProducers():
-                    for consumedItem in self.GetInputsAndResource(producer):
-                        if consumedItem not in seenItems:
-                            seenItems.add(consumedItem)
-                            nextItems.append(consumedItem)
-
-        return circularDepth
+    #Returns the best speciality boost any speciality could give the given item (at the max town level, so it's never less than the actual boost)
+    def GetBestSpecialityBoost(self, item: ITEM, recipe: Recipe.BaseRecipe) -> float:
+        return Catalog.catalog.GetBestSpecialityBoost(recipe, item)
+    
+    #Returns the items the update of the given item changes (the other outputs, inputs and building resources of it's primary producer)
+    def GetAffectedItems(self, item: ITEM) -> list[ITEM]:
+        recipe = self.itemRelations[item].primaryProducer
+        if not recipe:
+            return []
+        affectedItems = [output for output in recipe.outputs.keys() if output != item]
+        affectedItems.extend(recipe.inputs.keys())
+        affectedItems.extend(self.buildingConfigs[recipe.building].GetItemSuppliers().keys())
+        return affectedItems
+    
+    #Returns the items grouped into strongly connected components in the order they need updating, and whether each component is a cycle
+    #Items are only changed by items in the same or earlier components, so acyclic components only need updating once
+    #Only the cycles (such as the crystal -> depleted crystal -> RECHARGER loops) need repeating until they converge
+    def CalculateUpdateOrder(self) -> list[tuple[list[ITEM], bool]]:
+        components = Graph.GetStronglyConnectedComponents(self.itemRelations.keys(), self.GetAffectedItems)
+        return [(component, Graph.IsCycle(component, self.GetAffectedItems)) for component in components]
+    
+    #Returns the update order (see CalculateUpdateOrder), calculated once and shared with copies (don't change it)
+    def GetUpdateOrder(self) -> list[tuple[list[ITEM], bool]]:
+        if self.updateOrder is None:
+            self.updateOrder = self.CalculateUpdateOrder()
+        return self.updateOrder
+    
+    #Returns the speciality boost of every output of every recipe, lines with the same recipes and boosts calculate the same item data
+    def GetSpecialityBoosts(self) -> tuple[float, ...]:
+        return tuple(self.GetSpecialityBoost(item, recipe) for recipe in self.recipes for item in recipe.outputs.keys())
+    
+    #Uses the item data calculated for the given production line, which must have the same recipes, building configs, outputs and speciality boosts
+    #The item production data is shared like copies do, it's replaced rather than changed
+    def CopyItemData(self, line: "ProductionLine"):
+        self.itemData = line.itemData.copy()
+        self.valid = line.valid
+        self.invalidReason = line.invalidReason
+        self.cycles = line.cycles
+        self.unitScales = None
 
     #Updates the given item
     #Returns: -1 for divergence, 0 for had changes, 1 for no changes
@@ -413,78 +590,183 @@ class ProductionLine():
         if needToProduce > 0 and abs(diffFromPrimaryProducer) > 0.0000001:
             #Reduce amount needed to produce by speciality boost
             needToProduce /= self.GetSpecialityBoost(target, itemRelation.primaryProducer)
-            scale = needToProduce / itemRelation.primaryProducer.outputs[target]
-            work_units = scale * itemRelation.primaryProducer.work_units
-
-            #Get the building resources
-            buildingResources: dict[ITEM, float] = dict()
-            buildings: int = 1
-            if work_units > 0:
-                buildingConfig = self.buildingConfigs[itemRelation.primaryProducer.building]
-                if buildingConfig.work_units > 0:
-                    buildings = work_units / buildingConfig.work_units #Allow partial buildings for the resource calculations
-                    buildingResources = self.buildingConfigs[itemRelation.primaryProducer.building].GetItemSuppliers()
-            
-            #Set production of outputs (boosted by speciality boost)
-            for item, amount in itemRelation.primaryProducer.outputs.items():
-                self.itemData[item].SetProduced(scale * amount * self.GetSpecialityBoost(item, itemRelation.primaryProducer), itemRelation.primaryProducer)
-            #Set consumption of inputs
-            for item, amount in itemRelation.primaryProducer.inputs.items():
-                self.itemData[item].SetConsumption(cycle, scale * amount, itemRelation.primaryProducer)
-            #Set consumption of building resource
-            for item, amount in buildingResources.items():
-                self.itemData[item].SetConsumption(cycle, buildings * amount, itemRelation.primaryProducer)
-                
+            self.SetPrimaryScale(target, needToProduce / itemRelation.primaryProducer.outputs[target], cycle)
             return 0
         
         #Always return 0 instead of 1 until we reach the circular depth
         return cycle > itemData.circularDepth
     
+    #Sets the production of the outputs and the consumption of the inputs and building resources for the primary producer of the given item at the given scale
+    def SetPrimaryScale(self, target: ITEM, scale: float, cycle: int):
+        primaryProducer = self.itemRelations[target].primaryProducer
+        work_units = scale * primaryProducer.work_units
+
+        #Get the building resources
+        buildingResources: dict[ITEM, float] = dict()
+        buildings: int = 1
+        if work_units > 0:
+            buildingConfig = self.buildingConfigs[primaryProducer.building]
+            if buildingConfig.work_units > 0:
+                buildings = work_units / buildingConfig.work_units #Allow partial buildings for the resource calculations
+                buildingResources = buildingConfig.GetItemSuppliers()
+        
+        #Set production of outputs (boosted by speciality boost)
+        for item, amount in primaryProducer.outputs.items():
+            self.itemData[item].SetProduced(scale * amount * self.GetSpecialityBoost(item, primaryProducer), primaryProducer)
+        #Set consumption of inputs
+        for item, amount in primaryProducer.inputs.items():
+            self.itemData[item].SetConsumption(cycle, scale * amount, primaryProducer)
+        #Set consumption of building resource
+        for item, amount in buildingResources.items():
+            self.itemData[item].SetConsumption(cycle, buildings * amount, primaryProducer)
+    
+    #Returns the scale of the primary producer of each item in the given cycle so every item gets the given remaining amount from the cycle
+    #None if the cycle can't be solved directly (it's singular or a producer would need to run in reverse), then it has to be iterated
+    #Everything outside of the cycle is fixed by the time it's updated, so inside of it production is linear in the scales
+    def GetCycleScales(self, component: list[ITEM], remaining: list[float]) -> list[float] | None:
+        index = {item: i for i, item in enumerate(component)}
+        matrix = [[0.0] * len(component) for _ in component]
+        for column, item in enumerate(component):
+            recipe = self.itemRelations[item].primaryProducer
+            for output, quantity in recipe.outputs.items():
+                if output in index:
+                    matrix[index[output]][column] += quantity * self.GetSpecialityBoost(output, recipe)
+            for input, quantity in recipe.inputs.items():
+                if input in index:
+                    matrix[index[input]][column] -= quantity
+            for resource, quantity in self.GetBuildingResources(recipe, 1).items():
+                if resource in index:
+                    matrix[index[resource]][column] -= quantity
+        
+        scales = SolveLinearSystem(matrix, remaining)
+        if scales is None or min(scales) < -0.000000001:
+            return None
+        return [max(scale, 0) for scale in scales]
+    
+    #Returns how many fewer update cycles the item data took by solving each cycle directly rather than iterating it (calculates the item data again)
+    def GetCyclesSaved(self, solver: SOLVER = SOLVER.ITERATIVE) -> int:
+        iterated = self.copy()
+        iterated.CalculateItemData(self.GetAmount(), solver, False)
+        return iterated.cycles - self.cycles
+    
     #Calculates the production of every recipe to achieve the given amount of the target item
-    def CalculateItemData(self, amount: int):
-        #Calculate depths
-        recipeDepth = self.CalculateRecipeDepth()
-        itemDepth = self.CalculateItemDepth(recipeDepth)
-        circularItems = self.GetCircularItems(recipeDepth, itemDepth)
-        circularDepth = self.CalculateCircularDepth(circularItems)
+    #Cycles are solved directly where possible (solveCycles), otherwise they're iterated until they converge
+    #The linear solver reaches the same steady state in one step, so it can be used to cross-check the iterative solver
+    #The updates of the iterative solver are recorded in the given trace (if any)
+    def CalculateItemData(self, amount: float, solver: SOLVER = SOLVER.ITERATIVE, solveCycles: bool = True, trace: Trace.ConvergenceTrace | None = None):
+        if trace is not None and solver != SOLVER.ITERATIVE:
+            raise ValueError("Only the iterative solver can be traced")
+        metrics = Metrics.metrics
+        if metrics is None:
+            self.CalculateItemData_Internal(amount, solver, solveCycles, trace)
+            return
+        
+        start = time.perf_counter()
+        self.CalculateItemData_Internal(amount, solver, solveCycles, trace)
+        metrics.AddTime("solve", time.perf_counter() - start)
+        metrics.AddLine(self.cycles)
+    
+    #Sub-function of CalculateItemData, without the metrics
+    def CalculateItemData_Internal(self, amount: float, solver: SOLVER, solveCycles: bool, trace: Trace.ConvergenceTrace | None):
+        self.unitScales = None
+        self.cycles = 0
+        if solver == SOLVER.LINEAR:
+            import LinearSolver #Only the linear solver needs NumPy
+            scales = LinearSolver.SolveScales(self, amount)
+            if scales is None:
+                self.valid = False
+                self.invalidReason = "The linear system has no solution"
+                if Metrics.metrics is not None:
+                    Metrics.metrics.Count("rejected.unsolvable")
+                return
+            self.SetItemData(amount, scales)
+        else:
+            self.CalculateItemData_Iterative(amount, solveCycles, trace)
+            if not self.valid:
+                return
+        
+        self.CheckItemData()
+    
+    #Calculates the item data by updating each item in order, repeating the updates of each cycle until nothing in it changes
+    def CalculateItemData_Iterative(self, amount: int, solveCycles: bool = True, trace: Trace.ConvergenceTrace | None = None):
+        updateOrder = self.GetUpdateOrder()
 
         #Create item data
         self.itemData = dict()
-        for item, relations in self.itemRelations.items():
-            self.itemData[item] = ItemProductionData(item, circularDepth[item])
+        for item in self.itemRelations.keys():
+            self.itemData[item] = ItemProductionData(item, 0)
         
         cycle = 0
-        #Set output consumption of target item
-        self.itemData[self.target].SetConsumption(cycle, amount, None)
-
-        #Get item list and sort by ascending depth, ascending circular depth
-        items = list(self.itemRelations.keys())
-        items.sort(key=lambda x: (itemDepth[x], circularDepth[x]))
-        
-        #Repeat until either all items stop changing (for two cycles) or any diverges
-        hadChanges = True
-        cyclesSinceLastChange = 0
-        while cyclesSinceLastChange < 2:
-            hadChanges = False
-            #Update each item
-            for item in items:
-                updateResult = self.UpdateItem(item, cycle)
-                if updateResult == -1:
-                    self.valid = False
-                    return
-                elif updateResult == 0:
-                    hadChanges = True
-            if not hadChanges:
-                cyclesSinceLastChange += 1
-            else:
-                cyclesSinceLastChange = 0
-            cycle += 1
+        #Set output consumption of target item (and any extra outputs)
+        for item, quantity in self.GetOutputs(amount).items():
+            self.itemData[item].SetConsumption(cycle, quantity, None)
+            if trace is not None:
+                trace.Record(cycle, item, None, self.itemData[item].required, self.itemData[item].achieved)
+
+        for component, isCycle in updateOrder:
+            if not isCycle:
+                #Everything changing the item has already been updated, so one update is final (and can't diverge)
+                self.itemData[component[0]].circularDepth = cycle
+                if self.UpdateItem(component[0], cycle) == 0 and trace is not None:
+                    self.TraceUpdate(trace, component[0], cycle)
+                continue
 
+            #The requirements from earlier components are out of sync with the cycle, so wait until every item in it has been updated before checking for divergence
+            #A cycle solved directly only needs checking, the updates afterwards should be insignificant
+            circularDepth = cycle + len(component)
+            scales = self.GetCycleScales(component, [self.itemData[item].required - self.itemData[item].achieved for item in component]) if solveCycles else None
+            if scales is not None:
+                for item, scale in zip(component, scales):
+                    if scale > 0:
+                        self.SetPrimaryScale(item, scale, cycle)
+                        if trace is not None:
+                            self.TraceUpdate(trace, item, cycle)
+                cycle += 1
+                circularDepth = cycle
+            for item in component:
+                self.itemData[item].circularDepth = circularDepth
+
+            #Repeat until either all items in the cycle stop changing (for two cycles) or any diverges
+            cyclesSinceLastChange = 0
+            while cyclesSinceLastChange < 2:
+                hadChanges = False
+                #Update each item
+                for item in component:
+                    updateResult = self.UpdateItem(item, cycle)
+                    if updateResult == -1:
+                        self.valid = False
+                        self.invalidReason = f"{item} diverged in cycle {cycle}"
+                        self.cycles = cycle
+                        if Metrics.metrics is not None:
+                            Metrics.metrics.Count("rejected.divergence")
+                        return
+                    elif updateResult == 0:
+                        hadChanges = True
+                        if trace is not None:
+                            self.TraceUpdate(trace, item, cycle)
+                if not hadChanges:
+                    cyclesSinceLastChange += 1
+                else:
+                    cyclesSinceLastChange = 0
+                cycle += 1
+        self.cycles = cycle
+    
+    #Records the item data changed by the update of the given item (itself, and the items affected by it's primary producer) in the given trace
+    def TraceUpdate(self, trace: Trace.ConvergenceTrace, target: ITEM, cycle: int):
+        for item in [target] + self.GetAffectedItems(target):
+            itemData = self.itemData[item]
+            trace.Record(cycle, item, target, itemData.required, itemData.achieved)
+
+    #Checks the calculated item data, setting the production line invalid if any requirements aren't satisfied
+    def CheckItemData(self):
         #Check that the requirements are all satisfied
         for item, itemData in self.itemData.items():
             missing = itemData.required - itemData.achieved
             if missing > 0.00001:
                 self.valid = False
+                self.invalidReason = f"{item} is missing {missing}"
+                if Metrics.metrics is not None:
+                    Metrics.metrics.Count("rejected.unsatisfied")
                 return
             
         #This shouldn't ever trigger?
@@ -495,11 +777,53 @@ class ProductionLine():
                 if overproduction > 0.00001:
                     raise ValueError("Overproducing")
     
+    #Returns the scale each recipe is running at from the calculated item data
+    def GetScales(self) -> dict[Recipe.BaseRecipe, float]:
+        scales: dict[Recipe.BaseRecipe, float] = dict()
+        for recipe in self.recipes:
+            primaryOutput = next(iter(recipe.outputs))
+            itemData = self.itemData[primaryOutput]
+            scale = 0
+            if recipe in itemData.producerAchieved:
+                scale = itemData.producerAchieved[recipe] / recipe.outputs[primaryOutput]
+                scale /= self.GetSpecialityBoost(primaryOutput, recipe)
+            scales[recipe] = scale
+        return scales
+    
+    #Returns the amount of the target item the item data was calculated for
+    def GetAmount(self) -> float:
+        if not self.itemData:
+            raise ValueError("Item data not calculated")
+        return self.itemData[self.target].consumerRequires.get(None, 0)
+    
+    #Recalculates the item data and stats to produce the given amount of the target item (the extra outputs are scaled with it)
+    #For fixed recipes and specialities everything scales linearly with the amount, so this only rescales the solved line rather than solving it again
+    #Only the building counts (and the suppliers from them) are recalculated from the rescaled item data
+    def ScaleTo(self, rate: float):
+        if not self.valid:
+            raise ValueError("Can't scale an invalid production line")
+        if self.unitScales is None:
+            amount = self.GetAmount()
+            if amount <= 0:
+                raise ValueError("Item data wasn't calculated for a positive amount")
+            self.unitScales = {recipe: scale / amount for recipe, scale in self.GetScales().items()}
+        
+        self.SetItemData(rate, {recipe: scale * rate for recipe, scale in self.unitScales.items()})
+        self.CalculateStats()
+    
+    #Calculates the workers, buildings and base resources for every combination of the given target rates, happiness values and town levels
+    #The arguments are broadcast together like NumPy arrays, see LinearSolver.EvaluateBatch
+    def EvaluateBatch(self, rates: Any, happiness: Any, townLevels: Any):
+        import LinearSolver #Only the linear solver needs NumPy
+        return LinearSolver.EvaluateBatch(self, rates, happiness, townLevels)
+    
     #Calculates stats for production chain
     def CalculateStats(self):
         if not self.itemData:
             raise ValueError("Item data not calculated")
         
+        metrics = Metrics.metrics
+        start = time.perf_counter() if metrics is not None else 0
         self.stats = ProductionStats()
         
         for item, itemData in self.itemData.items():
@@ -524,7 +848,8 @@ class ProductionLine():
                     scale = itemData.producerAchieved[recipe] / recipe.outputs[item]
                     scale /= self.GetSpecialityBoost(next(iter(recipe.outputs.keys())), recipe)
                 total_work_units = scale * recipe.work_units
-                self.stats.buildingsPerRecipe[recipe] = math.ceil(total_work_units / optimal_config.work_units)
+                #Ignore rounding errors so exact amounts don't need an extra building
+                self.stats.buildingsPerRecipe[recipe] = math.ceil(total_work_units / optimal_config.work_units - 0.000000001)
 
                 suppliers: dict[WorkUnits.SUPPLIER, float] = optimal_config.suppliers
                 self.stats.suppliersPerRecipe[recipe] = dict()
@@ -535,11 +860,81 @@ class ProductionLine():
                         if supplier not in self.stats.totalSuppliers:
                             self.stats.totalSuppliers[supplier] = 0
                         self.stats.totalSuppliers[supplier] += amount * self.stats.buildingsPerRecipe[recipe]
+        
+        if metrics is not None:
+            metrics.AddTime("stats", time.perf_counter() - start)
+
+    #Calculates a lower bound of the item data and stats for any completion or specialisation of this production line
+    #Every output uses it's best speciality boost, items without a producer are free and byproducts are ignored
+    #Without byproducts production only grows as requirements are propagated from zero, so the bound holds even if we stop early
+    #Stops early if the production is diverging (no completion of this production line could be valid)
+    def CalculateLowerBound(self, amount: float, maxUpdates: int = 1000):
+        self.optimistic = True
+        self.unitScales = None
+
+        #Find the output and consumption per unit of scale for each recipe
+        producers: dict[ITEM, tuple[Recipe.BaseRecipe, float, list[tuple[ITEM, float]]]] = dict()
+        for recipe in self.recipes:
+            primaryOutput = next(iter(recipe.outputs))
+            if primaryOutput in Recipe.manager.byproducts:
+                continue
+            output = recipe.outputs[primaryOutput] * self.GetSpecialityBoost(primaryOutput, recipe)
+            consumption = list(recipe.inputs.items()) + list(self.GetBuildingResources(recipe, 1).items())
+            producers[primaryOutput] = (recipe, output, consumption)
+
+        #Propagate requirements down to the producers until the changes are insignificant
+        scales: dict[Recipe.BaseRecipe, float] = dict()
+        required: dict[ITEM, float] = self.GetOutputs(amount)
+        nextItems: deque[ITEM] = deque(required.keys())
+        updates = 0
+        while nextItems and updates < maxUpdates:
+            item = nextItems.popleft()
+            if item not in producers:
+                continue
+            recipe, output, consumption = producers[item]
+            scale = required[item] / output
+            diff = scale - scales.get(recipe, 0)
+            if diff <= 0.0000001 * scale:
+                continue
+            if scale > 1000000000:
+                break
+            updates += 1
+            scales[recipe] = scale
+            for consumedItem, quantity in consumption:
+                required[consumedItem] = required.get(consumedItem, 0) + diff * quantity
+                nextItems.append(consumedItem)
+        
+        self.SetItemData(amount, scales)
+        self.CalculateStats()
+    
+    #Sets the item data from the scale of each recipe
+    def SetItemData(self, amount: float, scales: dict[Recipe.BaseRecipe, float]):
+        self.itemData = dict()
+        for item in self.itemRelations.keys():
+            self.itemData[item] = ItemProductionData(item, 0)
+        for item, quantity in self.GetOutputs(amount).items():
+            self.itemData[item].SetConsumption(0, quantity, None)
+        for recipe, scale in scales.items():
+            for item, quantity in recipe.outputs.items():
+                self.itemData[item].SetProduced(scale * quantity * self.GetSpecialityBoost(item, recipe), recipe)
+            for item, quantity in recipe.inputs.items():
+                self.itemData[item].SetConsumption(0, scale * quantity, recipe)
+            for item, quantity in self.GetBuildingResources(recipe, scale).items():
+                self.itemData[item].SetConsumption(0, quantity, recipe)
+    
+    #Returns the building resources consumed by the given recipe at the given scale
+    def GetBuildingResources(self, recipe: Recipe.BaseRecipe, scale: float) -> dict[ITEM, float]:
+        work_units = scale * recipe.work_units
+        buildingConfig = self.buildingConfigs[recipe.building]
+        if work_units <= 0 or buildingConfig.work_units <= 0:
+            return dict()
+        buildings = work_units / buildingConfig.work_units #Allow partial buildings for the resource calculations
+        return {item: buildings * amount for item, amount in buildingConfig.GetItemSuppliers().items()}
 
 ######################################################################################################################################################
 #Create production lines
 
-#Sub-function of CreateProductionLines/CreateProductionLines_Internal
+#Sub-function of IterProductionLines and the searches which walk the recipe graph
 #Adds recipe to the chain and links the item as a primary output
 #Adds the item to the seen set
 #Adds the recipe inputs to the seen set and queue
@@ -552,146 +947,385 @@ def CreateProductionLines_AddRecipe(recipe: Recipe.BaseRecipe, itemQueue: deque[
             seenItems.add(item)
             itemQueue.append(item)
 
-#Internal recursive function for CreateProductionLines
-#Returns the production chains for the given item
-def CreateProductionLines_Internal(itemQueue: deque[ITEM], seenItems: set[ITEM], currentChain: ProductionLine) -> list[ProductionLine]:
+#Stores the alternative subchains for each item while enumerating production lines
+#A subchain is the recipes chosen for the items with alternatives needed to produce an item (items with one recipe always use it)
+#The subchains for each item are found once and combined, rather than re-walking the recipe graph for every choice made above it
+class SubchainCache():
+    #Stores the other primary recipes for the item each recipe produces (a subchain can only use one of them)
+    recipeAlternatives: dict[Recipe.BaseRecipe, frozenset[Recipe.BaseRecipe]]
+    #Stores every item which could be needed to produce each item
+    reachableItems: dict[ITEM, frozenset[ITEM]]
+    #Stores the subchains for an item, keyed by the item and the items it can reach that are already being produced higher up the chain
+    subchains: dict[tuple[ITEM, frozenset[ITEM]], list[frozenset[Recipe.BaseRecipe]]]
+
+    #Stores the town state, only recipes using unlocked buildings are used
+    state: Town.TownState
+    #Stores the primary recipes using unlocked buildings for each item (only used if some buildings are locked)
+    unlockedRecipes: dict[ITEM, list[Recipe.BaseRecipe]]
+
+    def __init__(self, state: Town.TownState | None = None) -> None:
+        self.recipeAlternatives = dict()
+        self.reachableItems = dict()
+        self.subchains = dict()
+        self.state = Town.defaultState if state is None else state
+        self.unlockedRecipes = dict()
+    
+    #Returns the primary recipes for the given item
+    def GetRecipes(self, item: ITEM) -> list[Recipe.BaseRecipe]:
+        if self.state.unlockedBuildings is None:
+            recipes = Catalog.catalog.GetPrimary(item)
+        else:
+            if item not in self.unlockedRecipes:
+                self.unlockedRecipes[item] = Catalog.catalog.GetPrimary(item, self.state)
+            recipes = self.unlockedRecipes[item]
+        if recipes and recipes[0] not in self.recipeAlternatives:
+            for recipe in recipes:
+                self.recipeAlternatives[recipe] = frozenset(recipes).difference([recipe])
+        return recipes
+    
+    #Returns the inputs and building resources of the given recipe (in the same order as ProductionLine.GetInputsAndResource)
+    def GetInputs(self, recipe: Recipe.BaseRecipe) -> set[ITEM]:
+        return Catalog.catalog.GetInputsAndResource(recipe)
+    
+    #Returns every item which could be needed to produce the given item
+    def GetReachable(self, item: ITEM) -> frozenset[ITEM]:
+        if item not in self.reachableItems:
+            reachable: set[ITEM] = set()
+            nextItems = [item]
+            while nextItems:
+                for recipe in self.GetRecipes(nextItems.pop()):
+                    for inputItem in self.GetInputs(recipe):
+                        if inputItem not in reachable:
+                            reachable.add(inputItem)
+                            nextItems.append(inputItem)
+            self.reachableItems[item] = frozenset(reachable)
+        return self.reachableItems[item]
+    
+    #Returns the subchains for the given item, where the given items are already produced higher up the chain
+    #Items with more than one recipe (like water and fuel) only get one producer, subchains which choose different ones aren't combined
+    def GetSubchains(self, item: ITEM, producedItems: frozenset[ITEM]) -> list[frozenset[Recipe.BaseRecipe]]:
+        key = (item, producedItems.intersection(self.GetReachable(item)))
+        if key in self.subchains:
+            return self.subchains[key]
+        
+        #If there are no primary recipes then we either get this item as a byproduct from a recipe added elsewhere or it's not valid
+        recipes = self.GetRecipes(item)
+        subchains: list[frozenset[Recipe.BaseRecipe]] = [] if recipes else [frozenset()]
+        inputsProduced = key[1].union([item])
+        for recipe in recipes:
+            combined = [frozenset([recipe]) if len(recipes) > 1 else frozenset()]
+            for inputItem in self.GetInputs(recipe):
+                if inputItem not in inputsProduced:
+                    combined = self.CombineSubchains(combined, self.GetSubchains(inputItem, inputsProduced))
+            subchains.extend(combined)
+        
+        self.subchains[key] = subchains
+        return subchains
+    
+    #Returns every combination of the given subchains which agree on the recipe for the items they share
+    def CombineSubchains(self, subchainsA: list[frozenset[Recipe.BaseRecipe]], subchainsB: list[frozenset[Recipe.BaseRecipe]]) -> list[frozenset[Recipe.BaseRecipe]]:
+        #Only the recipes that could conflict with the second subchains matter, so group the first subchains by those
+        recipesB = frozenset().union(*subchainsB)
+        relevantRecipes = recipesB.union(*[self.recipeAlternatives[recipe] for recipe in recipesB])
+        groupsA: dict[frozenset[Recipe.BaseRecipe], list[frozenset[Recipe.BaseRecipe]]] = dict()
+        for subchainA in subchainsA:
+            groupsA.setdefault(subchainA.intersection(relevantRecipes), []).append(subchainA)
+
+        combined: list[frozenset[Recipe.BaseRecipe]] = []
+        for subchainB in subchainsB:
+            conflicts = frozenset().union(*[self.recipeAlternatives[recipe] for recipe in subchainB])
+            for relevantA, groupA in groupsA.items():
+                if relevantA.isdisjoint(conflicts):
+                    combined.extend(subchainA | subchainB for subchainA in groupA)
+        return combined
+
+#Internal recursive generator for IterProductionLines
+#Creates the production chains for the given subchains, depth first with the alternative recipes of each item in catalog order
+#Chains choosing the same recipes share the work of adding them, only the subchains using a recipe are followed when it's chosen
+def IterSubchainLines_Internal(itemQueue: deque[ITEM], seenItems: set[ITEM], currentChain: ProductionLine, subchains: list[frozenset[Recipe.BaseRecipe]], cache: SubchainCache) -> Iterator[ProductionLine]:
     while len(itemQueue) > 0:
         item = itemQueue.popleft()
-        recipes = Recipe.manager.GetPrimary(item)
-
-        if len(recipes) == 0:
-            #If there are no primary recipes then we either get this item as a byproduct from a recipe added elsewhere or it's not valid
-            #We'll determine that later
-            #raise ValueError(f"No recipes with {item} as the primary output")
-            pass
-        elif len(recipes) > 1:
-            productionLines: list[ProductionLine] = []
-            for recipe in recipes:
-                if not currentChain.HasRecipe(recipe):
+        recipes = cache.GetRecipes(item)
+
+        if len(recipes) > 1:
+            #Only follow the recipes used by at least one subchain
+            recipeSubchains = [(recipe, [subchain for subchain in subchains if recipe in subchain]) for recipe in recipes]
+            recipeSubchains = [(recipe, matchingSubchains) for recipe, matchingSubchains in recipeSubchains if matchingSubchains]
+            if Metrics.metrics is not None:
+                Metrics.metrics.Count("branches", len(recipeSubchains))
+            for i, (recipe, matchingSubchains) in enumerate(recipeSubchains):
+                #The last recipe can use the current chain rather than a copy
+                if i == len(recipeSubchains) - 1:
+                    CreateProductionLines_AddRecipe(recipe, itemQueue, seenItems, currentChain)
+                    yield from IterSubchainLines_Internal(itemQueue, seenItems, currentChain, matchingSubchains, cache)
+                else:
                     itemQueueCopy = itemQueue.copy()
                     seenItemsCopy = seenItems.copy()
                     currentChainCopy = currentChain.copy()
                     CreateProductionLines_AddRecipe(recipe, itemQueueCopy, seenItemsCopy, currentChainCopy)
-                        
-                    productionLines += CreateProductionLines_Internal(itemQueueCopy, seenItemsCopy, currentChainCopy)
-            return productionLines
-        elif not currentChain.HasRecipe(recipes[0]):
+                    yield from IterSubchainLines_Internal(itemQueueCopy, seenItemsCopy, currentChainCopy, matchingSubchains, cache)
+            return
+        elif recipes:
             CreateProductionLines_AddRecipe(recipes[0], itemQueue, seenItems, currentChain)
 
-    return [currentChain]
+    yield currentChain
+
+#Yields the production chains for the given item one at a time, depth first with the alternative recipes of each item in catalog order
+#Chains that fail validation are skipped, some will still be invalid and need filtered out later
+#The time spent enumerating is recorded between the lines yielded, so it doesn't include the time spent using them
+def IterProductionLines(item: ITEM, state: Town.TownState | None = None) -> Iterator[ProductionLine]:
+    metrics = Metrics.metrics
+    start = time.perf_counter() if metrics is not None else 0
+    cache = SubchainCache(state)
+    subchains = cache.GetSubchains(item, frozenset())
+    for line in IterSubchainLines_Internal(deque([item]), {item}, ProductionLine(item, state), subchains, cache):
+        if line.Validate():
+            if metrics is not None:
+                metrics.AddTime("enumerate", time.perf_counter() - start)
+            yield line
+            if metrics is not None:
+                start = time.perf_counter()
+        elif metrics is not None:
+            metrics.Count("rejected.validate")
+    if metrics is not None:
+        metrics.AddTime("enumerate", time.perf_counter() - start)
 
 #Returns the production chains for the given item
 #Some will be invalid and need filtered out later
-def CreateProductionLines(item: ITEM) -> list[ProductionLine]:
-    productionLines = CreateProductionLines_Internal(deque([item]), {item}, ProductionLine(item))
-    productionLines = [line for line in productionLines if line.Validate()]
-    return productionLines
-
-T = TypeVar("T")
-T2 = TypeVar("T2")
-
-def MinimiseVariants_Internal(items: deque[tuple[T, set[T2]]], seen: set[T2], current: dict[T, T2]) -> tuple[list[dict[T, T2]], int]:
-    while items:
-        key, variants = items.popleft()
-        #Filter variants to the already seen ones
-        selectFromVariants = variants.intersection(seen)
-        #If no variants match the already seen then accept the new variants
-        if not selectFromVariants:
-            selectFromVariants = variants.copy()
-        
-        if len(selectFromVariants) == 1:
-            variant = selectFromVariants.pop()
-            seen.add(variant)
-            current[key] = variant
-        elif len(selectFromVariants) > 1:
-            result: list[dict[T, T2]] = []
-            seenCount = 9999
-            for variant in selectFromVariants:
-                itemsCopy = items.copy()
-                seenCopy = seen.copy()
-                currentCopy = current.copy()
-                seenCopy.add(variant)
-                currentCopy[key] = variant
-                newResult, newSeenCount = MinimiseVariants_Internal(itemsCopy, seenCopy, currentCopy)
-                result += newResult
-                seenCount = min(seenCount, newSeenCount)
-            return result, seenCount
-        else:
-            raise ValueError("No variants?")
-    
-    return [current], len(seen)
-
-#Given a dictionary where each entry contains a set of possible values
-#Minimises the variation of possible values
-#Returning a list of dictionary where the value is a single option from the possible values
-def MinimiseVariants(dictOfSet: dict[T, set[T2]]) -> list[dict[T, T2]]:
-    result, seenCount = MinimiseVariants_Internal(deque(dictOfSet.items()), set(), dict())
+def CreateProductionLines(item: ITEM, state: Town.TownState | None = None) -> list[ProductionLine]:
+    return list(IterProductionLines(item, state))
 
-    #result = [x for x in result if len(set(x.values())) <= seenCount]
-    return result
+#Stores the options for SolveSpecialities, the boost each speciality gives the outputs of each recipe (in the order of the recipe outputs)
+SpecialityOptions = dict[Recipe.BaseRecipe, dict[Speciality.SPECIALITY, tuple[float, ...]]]
+#Stores an assignment found by SolveSpecialities as the specialities it uses, the boosts it gives (each recipe's outputs in turn) and the speciality of each recipe
+SpecialityAssignment = tuple[frozenset[Speciality.SPECIALITY], list[float], dict[Recipe.BaseRecipe, Speciality.SPECIALITY]]
 
-#Returns speciality variants of the given production line
-#Tries to minimise the total number of specialities
-def SpecialiseProductionLine(line: ProductionLine) -> list[ProductionLine]:
-    #Find the specialities for each recipe
-    recipeSpecialities: dict[Recipe.BaseRecipe, set[Speciality.SPECIALITY]] = dict()
+#Returns the speciality options of each recipe in the given production line that can use a speciality, at the town levels of it's town state
+def GetSpecialityOptions(line: ProductionLine) -> SpecialityOptions:
+    options: SpecialityOptions = dict()
     for recipe in line.recipes:
-        recipeSpecialities[recipe] = set()
-        for item in list(recipe.outputs.keys()):
-            recipeSpecialities[recipe].update(Speciality.GetSpecialities(item, recipe.building))
-        if not recipeSpecialities[recipe]:
-            del recipeSpecialities[recipe]
+        specialities = Catalog.catalog.GetRecipeSpecialities(recipe)
+        if specialities:
+            #Sorted so the assignments are found in the same order every run
+            options[recipe] = {speciality: tuple(Catalog.catalog.GetSpecialityBoost(recipe, item, speciality, line.state.GetTownLevel(speciality)) for item in recipe.outputs.keys())
+                               for speciality in sorted(specialities, key=lambda x: x.value)}
+    return options
+
+#Returns whether an assignment using the specialities and giving the boosts of A is at least as good as one for B (it uses no other specialities and none of it's boosts are lower)
+def IsAtLeastAsGood_Internal(specialitiesA: frozenset[Speciality.SPECIALITY], boostsA: list[float], specialitiesB: frozenset[Speciality.SPECIALITY], boostsB: list[float]) -> bool:
+    return specialitiesA <= specialitiesB and all(a >= b for a, b in zip(boostsA, boostsB))
+
+#Internal recursive function for SolveSpecialities
+#Assigns the recipe at the given index, the boosts of the recipes after it are their best boosts so they bound every completion of the current assignment
+#Branches are pruned when an assignment already found is at least as good as that bound
+def SolveSpecialities_Internal(recipes: list[tuple[Recipe.BaseRecipe, int]], index: int, options: SpecialityOptions, used: frozenset[Speciality.SPECIALITY], boosts: list[float], current: dict[Recipe.BaseRecipe, Speciality.SPECIALITY], found: list[SpecialityAssignment]):
+    for foundUsed, foundBoosts, _ in found:
+        if IsAtLeastAsGood_Internal(foundUsed, foundBoosts, used, boosts):
+            return
+    
+    if index == len(recipes):
+        #Remove the assignments this one is better than
+        found[:] = [assignment for assignment in found if not IsAtLeastAsGood_Internal(used, boosts, assignment[0], assignment[1])]
+        found.append((used, boosts.copy(), current.copy()))
+        return
     
-    minimisedSpecialities = MinimiseVariants(recipeSpecialities)
+    recipe, offset = recipes[index]
+    recipeOptions = options[recipe]
+    if len(recipeOptions) > 1 and Metrics.metrics is not None:
+        Metrics.metrics.Count("variantBranches", len(recipeOptions))
+    #Try the specialities already used first, they're the most likely to be part of the best assignments (so more branches are pruned)
+    bestBoosts = boosts[offset:offset + len(recipe.outputs)]
+    for speciality in sorted(recipeOptions, key=lambda x: x not in used):
+        current[recipe] = speciality
+        boosts[offset:offset + len(recipe.outputs)] = recipeOptions[speciality]
+        SolveSpecialities_Internal(recipes, index + 1, options, used | {speciality}, boosts, current, found)
+    del current[recipe]
+    boosts[offset:offset + len(recipe.outputs)] = bestBoosts
+
+#Returns the speciality of each recipe for the non-dominated assignments of the given options, best first
+#An assignment is dominated if another one uses a subset of it's specialities without lowering any boost, so at the max town level these are the minimal sets of specialities covering every recipe
+#The best assignment uses the fewest specialities, then has the highest total boost
+#Only the best assignment is returned if bestOnly is set
+def SolveSpecialities(options: SpecialityOptions, bestOnly: bool = False) -> list[dict[Recipe.BaseRecipe, Speciality.SPECIALITY]]:
+    #Recipes with fewer options are assigned first, those with one option are forced and narrow down the rest
+    recipes: list[tuple[Recipe.BaseRecipe, int]] = []
+    boosts: list[float] = []
+    for recipe in sorted(options, key=lambda x: len(options[x])):
+        recipes.append((recipe, len(boosts)))
+        boosts.extend(max(recipeBoosts[i] for recipeBoosts in options[recipe].values()) for i in range(len(recipe.outputs)))
+    
+    found: list[SpecialityAssignment] = []
+    SolveSpecialities_Internal(recipes, 0, options, frozenset(), boosts, dict(), found)
+    found.sort(key=lambda x: (len(x[0]), -sum(x[1])))
+    if bestOnly:
+        found = found[:1]
+    #Keep the recipes in the order of the options
+    return [{recipe: assignment[recipe] for recipe in options} for _, _, assignment in found]
+
+#Returns speciality variants of the given production line, one for each non-dominated speciality assignment (see SolveSpecialities)
+#Only the best variant is returned if bestOnly is set
+def SpecialiseProductionLine(line: ProductionLine, bestOnly: bool = False) -> list[ProductionLine]:
+    metrics = Metrics.metrics
+    start = time.perf_counter() if metrics is not None else 0
+    assignments = SolveSpecialities(GetSpecialityOptions(line), bestOnly)
 
     productionLines: list[ProductionLine] = []
-    for specialityConfig in minimisedSpecialities:
+    for specialityConfig in assignments:
         specialisedLine = line.copy()
         for recipe, speciality in specialityConfig.items():
-            specialisedLine.recipeSpecialities[recipe] = speciality
+            specialisedLine.SetSpeciality(recipe, speciality)
         productionLines.append(specialisedLine)
+    
+    if metrics is not None:
+        metrics.AddTime("specialise", time.perf_counter() - start)
+        metrics.Count("variants", len(productionLines))
     return productionLines
 
+#Calculates the item data of the speciality variants of a single production line (from SpecialiseProductionLine)
+#Variants only differ in their speciality boosts, so the ones with the same boosts share a single solve (at the max town level every speciality gives the same boost, so they all do)
+#Variants with different boosts still share the update order
+def CalculateVariantItemData(variants: list[ProductionLine], amount: float):
+    solved: dict[tuple[float, ...], ProductionLine] = dict()
+    for variant in variants:
+        #Copies share the recipes until they're changed
+        if variant.recipes is not variants[0].recipes:
+            raise ValueError("The variants aren't of the same production line")
+        boosts = variant.GetSpecialityBoosts()
+        if boosts in solved:
+            variant.CopyItemData(solved[boosts])
+            if Metrics.metrics is not None:
+                Metrics.metrics.Count("sharedSolves")
+        else:
+            variant.CalculateItemData(amount)
+            solved[boosts] = variant
+
 ####################################################################################################################################################################################################
 
 #Writes valid chains to a file
-def WriteValidChains(item: ITEM, chains: list[ProductionLine]):
+#Chains are written as they are received, so a generator can be passed to stream them
+def WriteValidChains(item: ITEM, chains: Iterable[ProductionLine]):
     now = datetime.now()
     nowStr = now.strftime('%d-%m-%y#%H-%M-%S')
     with open(f"Chains\\{item.name}-ValidChains-{nowStr}.txt", "w") as file:
         validChains = 0
-        for chain in chains:
-            if chain.valid:
-                validChains += 1
-
-        file.write(f"{validChains} out of {len(chains)} are valid.\n")
+        totalChains = 0
         for i, chain in enumerate(chains):
+            totalChains += 1
             if chain.valid:
+                validChains += 1
                 file.write(f"Chain {i} is valid:\n{chain}\n")
             else:
                 file.write(f"Chain {i} is not valid:\n{chain}\n")
 
-#Returns a list of valid and finalised production lines for the given item
-def GetProductionLines(item: ITEM) -> list[ProductionLine]:
-    allProductionLines = CreateProductionLines(item)
-    specialisedProductionLines: list[ProductionLine] = list()
+        file.write(f"{validChains} out of {totalChains} are valid.\n")
+
+#The compressions chains can be written with and the file extension for each
+CHAIN_COMPRESSIONS = {None: "", "gzip": ".gz", "zstd": ".zst"}
+
+#Opens the given file as text with the given compression (None, "gzip" or "zstd") in the given mode ("r" or "w")
+def OpenChainFile_Internal(path: str, mode: str, compression: str | None):
+    if compression is None:
+        return open(path, mode, encoding="utf-8")
+    elif compression == "gzip":
+        return gzip.open(path, mode + "t", encoding="utf-8")
+    elif compression == "zstd":
+        try:
+            from compression import zstd #Python 3.14+
+            return zstd.open(path, mode + "t", encoding="utf-8")
+        except ImportError:
+            import zstandard #Only zstd compression needs zstandard before Python 3.14
+            return zstandard.open(path, mode + "t", encoding="utf-8")
+    raise ValueError(f"Unknown compression {compression}")
+
+#Writes chains to a JSON Lines file (optionally compressed), returning the path of the file
+#Each line is one JSON object: a header with the target item, then each chain (ProductionLine.ToDict with it's index), then a trailer with the number of valid chains
+#Chains are written as they are received, so a generator can be passed to stream them, and a file without the trailer was not finished
+def WriteChains(item: ITEM, chains: Iterable[ProductionLine], path: str | None = None, compression: str | None = None) -> str:
+    if path is None:
+        nowStr = datetime.now().strftime('%d-%m-%y#%H-%M-%S')
+        path = os.path.join("Chains", f"{item.name}-Chains-{nowStr}.jsonl{CHAIN_COMPRESSIONS[compression]}")
+
+    with OpenChainFile_Internal(path, "w", compression) as file:
+        file.write(json.dumps({"header": {"target": item.name}}, separators=(",", ":")) + "\n")
+        validChains = 0
+        totalChains = 0
+        for i, chain in enumerate(chains):
+            totalChains += 1
+            if chain.valid:
+                validChains += 1
+            file.write(json.dumps({"index": i} | chain.ToDict(), separators=(",", ":")) + "\n")
+
+        file.write(json.dumps({"trailer": {"valid": validChains, "total": totalChains}}, separators=(",", ":")) + "\n")
+    return path
+
+#Yields the chains written to the given file by WriteChains one at a time, the compression is found from the file extension
+#Raises a ValueError at the end if the file has no trailer (it was not finished)
+def IterWrittenChains(path: str) -> Iterator[ProductionLine]:
+    compression = next((compression for compression, extension in CHAIN_COMPRESSIONS.items() if extension and path.endswith(extension)), None)
+    with OpenChainFile_Internal(path, "r", compression) as file:
+        for line in file:
+            data = json.loads(line)
+            if "trailer" in data:
+                return
+            if "header" not in data:
+                yield ProductionLine.FromDict(data)
+    raise ValueError(f"The chains file {path} has no trailer")
+
+#Evaluates the given production line, returning it's valid specialised production lines (none if the line is invalid)
+def EvaluateProductionLine_Internal(line: ProductionLine, group_id: int, amount: float = 2) -> list[ProductionLine]:
+    line.CalculateItemData(amount)
+    if not line.valid:
+        return []
+    line.group_id = group_id
 
-    #Filter out invalid chains, specialise all the valid ones
-    for i, line in enumerate(allProductionLines):
-        line.CalculateItemData(2)
-        if line.valid:
-            line.group_id = i
-            specialisedProductionLines.extend(SpecialiseProductionLine(line))
-    
     #Calculate item data and stats for specialised production lines
-    for i, line in enumerate(specialisedProductionLines):
-        line.CalculateItemData(2)
-        if not line.valid:
+    specialisedLines = SpecialiseProductionLine(line)
+    CalculateVariantItemData(specialisedLines, amount)
+    for specialisedLine in specialisedLines:
+        if not specialisedLine.valid:
             raise ValueError("Specialised production line became invalid?")
-        
-        line.CalculateStats()
-    
-    return specialisedProductionLines
+
+        specialisedLine.CalculateStats()
+    return specialisedLines
+
+#Evaluates the given chunk of production lines, the first of which has the given group id, returning their valid specialised production lines in order
+def EvaluateProductionLines_Internal(lines: list[ProductionLine], group_id: int, amount: float = 2) -> list[ProductionLine]:
+    specialisedLines = []
+    for i, line in enumerate(lines):
+        specialisedLines.extend(EvaluateProductionLine_Internal(line, group_id + i, amount))
+    return specialisedLines
+
+#Yields the valid and finalised production lines for the given item one at a time, producing the given amount of the item
+#Each chain is evaluated and specialised as it is enumerated, workers > 1 evaluates them in that many processes
+#Use ProductionLine.ScaleTo to get a finalised production line for other amounts without evaluating it again
+#The lines are for the given town state (the default town state if none is given)
+def IterEvaluatedProductionLines(item: ITEM, workers: int = 1, chunksize: int = 16, amount: float = 2, state: Town.TownState | None = None) -> Iterator[ProductionLine]:
+    #Filter out invalid chains, specialise all the valid ones
+    if workers <= 1:
+        for i, line in enumerate(IterProductionLines(item, state)):
+            yield from EvaluateProductionLine_Internal(line, i, amount)
+        return
+
+    #Evaluate chunks of lines in worker processes, only keeping a bounded window of chunks in flight (map would enumerate every line up front)
+    #The results are yielded in submission order, the same order as the serial path
+    lines = IterProductionLines(item, state)
+    pending = deque()
+    group_id = 0
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        while True:
+            while len(pending) < workers * 2:
+                chunk = list(itertools.islice(lines, chunksize))
+                if not chunk:
+                    break
+                pending.append(executor.submit(EvaluateProductionLines_Internal, chunk, group_id, amount))
+                group_id += len(chunk)
+            if not pending:
+                break
+            yield from pending.popleft().result()
+
+#Returns a list of valid and finalised production lines for the given item
+def GetProductionLines(item: ITEM, workers: int = 1, chunksize: int = 16, amount: float = 2, state: Town.TownState | None = None) -> list[ProductionLine]:
+    return list(IterEvaluatedProductionLines(item, workers, chunksize, amount, state))
 
 ####################################################################################################################################################################################################
 # SORTING
@@ -712,4 +1346,137 @@ def SortByRequired(x: ProductionLine, item: ITEM) -> int:
 def SortByBuildings(x: ProductionLine) -> int:
     return sum(x.stats.buildingsPerRecipe.values())
 
+#Sorts by number of workers, then iron ore, then number of buildings
+def SortByDefault(x: ProductionLine) -> tuple[int, int, int]:
+    return (SortByWorkers(x), SortByRequired(x, NATURAL_RESOURCE.iron_ore), SortByBuildings(x))
+
+#Returns a sort function for a weighted cost of workers, buildings and base resources
+def WeightedCost(workers: float = 1, buildings: float = 0, resources: dict[NATURAL_RESOURCE, float] | None = None) -> Callable[[ProductionLine], float]:
+    def Cost(x: ProductionLine) -> float:
+        cost = workers * SortByWorkers(x) + buildings * SortByBuildings(x)
+        for item, weight in (resources or dict()).items():
+            cost += weight * SortByRequired(x, item)
+        return cost
+    return Cost
+
+####################################################################################################################################################################################################
+# SEARCH
+
+#Stores the state of a branch-and-bound search for the best production lines
+#The sort key must not decrease as production increases (true for all of the sort functions above), so lower bounds on partial chains are valid
+class ProductionLineSearch():
+    k: int
+    key: Callable[[ProductionLine], Any]
+    amount: float
+
+    #Stores the best lines found so far as (key, path, variant index, line), sorted best first
+    best: list[tuple[Any, tuple[int, ...], int, ProductionLine]]
+    
+    #Stores the number of chains and partial chains explored and pruned
+    explored: int
+    pruned: int
+    #Stores the number of complete chains evaluated
+    evaluated: int
+
+    def __init__(self, k: int, key: Callable[[ProductionLine], Any], amount: float) -> None:
+        self.k = k
+        self.key = key
+        self.amount = amount
+        self.best = []
+        self.explored = 0
+        self.pruned = 0
+        self.evaluated = 0
+    
+    #Returns the lower bound of the sort key for the given (partial) chain
+    def GetLowerBound(self, chain: ProductionLine) -> Any:
+        bound = chain.copy()
+        bound.CalculateLowerBound(self.amount)
+        return self.key(bound)
+    
+    #Returns whether no chain with the given lower bound and branch path can beat the current k-th best line
+    #Ties are broken by path, which is the order the lines would be enumerated in by IterProductionLines
+    def CanPrune(self, bound: Any, path: tuple[int, ...]) -> bool:
+        if len(self.best) < self.k:
+            return False
+        worstKey, worstPath, _, _ = self.best[-1]
+        if bound != worstKey:
+            return bound > worstKey
+        return path > worstPath[:len(path)]
+    
+    #Adds the given evaluated line if it's one of the best lines
+    def Add(self, line: ProductionLine, path: tuple[int, ...], variant: int):
+        entry = (self.key(line), path, variant, line)
+        bisect.insort(self.best, entry, key=lambda x: x[:3])
+        if len(self.best) > self.k:
+            self.best.pop()
+    
+    #Evaluates and specialises the given complete chain
+    def Evaluate(self, line: ProductionLine, path: tuple[int, ...]):
+        if not line.Validate():
+            if Metrics.metrics is not None:
+                Metrics.metrics.Count("rejected.validate")
+            return
+        if self.CanPrune(self.GetLowerBound(line), path):
+            self.pruned += 1
+            if Metrics.metrics is not None:
+                Metrics.metrics.Count("pruned")
+            return
+        
+        self.evaluated += 1
+        line.CalculateItemData(self.amount)
+        if not line.valid:
+            return
+        line.group_id = self.evaluated - 1
+
+        specialisedLines = SpecialiseProductionLine(line)
+        CalculateVariantItemData(specialisedLines, self.amount)
+        for variant, specialisedLine in enumerate(specialisedLines):
+            if not specialisedLine.valid:
+                raise ValueError("Specialised production line became invalid?")
+            
+            specialisedLine.CalculateStats()
+            self.Add(specialisedLine, path, variant)
+
+#Internal recursive function for GetBestProductionLines
+#Walks the recipe graph like IterProductionLines, but explores the alternatives with the lowest bound first and skips any that can't beat the current best lines
+def SearchProductionLines_Internal(itemQueue: deque[ITEM], seenItems: set[ITEM], currentChain: ProductionLine, path: tuple[int, ...], search: ProductionLineSearch):
+    search.explored += 1
+    while len(itemQueue) > 0:
+        item = itemQueue.popleft()
+        recipes = Catalog.catalog.GetPrimary(item, currentChain.state)
+
+        if len(recipes) > 1:
+            branches: list[tuple[Any, tuple[int, ...], deque[ITEM], set[ITEM], ProductionLine]] = []
+            for index, recipe in enumerate(recipes):
+                if not currentChain.HasRecipe(recipe):
+                    if Metrics.metrics is not None:
+                        Metrics.metrics.Count("branches")
+                    itemQueueCopy = itemQueue.copy()
+                    seenItemsCopy = seenItems.copy()
+                    currentChainCopy = currentChain.copy()
+                    CreateProductionLines_AddRecipe(recipe, itemQueueCopy, seenItemsCopy, currentChainCopy)
+                    branches.append((search.GetLowerBound(currentChainCopy), path + (index,), itemQueueCopy, seenItemsCopy, currentChainCopy))
+            
+            branches.sort(key=lambda x: x[:2])
+            for bound, branchPath, itemQueueCopy, seenItemsCopy, currentChainCopy in branches:
+                #The best lines may have improved while exploring the previous branches
+                if search.CanPrune(bound, branchPath):
+                    search.pruned += 1
+                    if Metrics.metrics is not None:
+                        Metrics.metrics.Count("pruned")
+                    continue
+                SearchProductionLines_Internal(itemQueueCopy, seenItemsCopy, currentChainCopy, branchPath, search)
+            return
+        elif len(recipes) == 1 and not currentChain.HasRecipe(recipes[0]):
+            CreateProductionLines_AddRecipe(recipes[0], itemQueue, seenItems, currentChain)
+
+    search.Evaluate(currentChain, path)
+
+#Returns the k best valid and finalised production lines for the given item, sorted by the given key
+#Gives the same lines as sorting the result of GetProductionLines, without evaluating chains that can't be in the best k
+def GetBestProductionLines(item: ITEM, k: int, key: Callable[[ProductionLine], Any] = SortByDefault, amount: float = 2, state: Town.TownState | None = None) -> list[ProductionLine]:
+    search = ProductionLineSearch(k, key, amount)
+    SearchProductionLines_Internal(deque([item]), {item}, ProductionLine(item, state), (), search)
+    return [line for _, _, _, line in search.best]
+
 ####################################################################################################################################################################################################
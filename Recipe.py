@@ -1,43 +1,83 @@
 from Buildings import *
 from Items import *
+from types import MappingProxyType
+from typing import Any, Mapping
+import json, os, pickle
 
 #Base recipe class
+#Once added to a manager a recipe is frozen, it gets a stable id and can't be changed
+#Frozen recipes are unique per id (pickling or copying one gives back the manager's recipe), so identity hashing matches their value
+#That keeps recipes as cheap dict keys while lines can still be pickled and reloaded
 class BaseRecipe():
     building: BUILDING
-    outputs: dict[ITEM, int]
+    outputs: Mapping[ITEM, int]
 
-    inputs: dict[ITEM, int]
+    inputs: Mapping[ITEM, int]
     work_units: int
 
+    #Stores the stable id of this recipe (None until it's frozen)
+    id: str | None
+
     def __init__(self, outputs: dict[ITEM, int], inputs: dict[ITEM, int], work_units: int):
+        self.id = None
         self.outputs = outputs
         self.inputs = inputs | {}
         self.work_units = work_units
     
+    #Sets the building for this recipe and makes it immutable
+    def Freeze(self, building: BUILDING):
+        self.building = building
+        self.outputs = MappingProxyType(dict(self.outputs))
+        self.inputs = MappingProxyType(dict(self.inputs))
+        self.id = CreateRecipeId(building, self.outputs, self.inputs)
+    
+    def __setattr__(self, name: str, value) -> None:
+        if getattr(self, "id", None) is not None:
+            raise AttributeError(f"Can't set {name}, the recipe {self.id} is frozen")
+        super().__setattr__(name, value)
+    
+    def __reduce_ex__(self, protocol):
+        if self.id is None:
+            return super().__reduce_ex__(protocol)
+        return (GetRecipe, (self.id,))
+    
     def __str__(self) -> str:
-        result = f"{self.building.name}: Outputs=("
-        for item, amount in self.outputs.items():
-            result += f"{item.name} = {amount},"
-            
-        result += "), Inputs=("
-        for item, amount in self.inputs.items():
-            result += f"{item.name} = {amount},"
+        outputs = "".join(f"{item.name} = {amount}," for item, amount in self.outputs.items())
+        inputs = "".join(f"{item.name} = {amount}," for item, amount in self.inputs.items())
+        return f"{self.building.name}: Outputs=({outputs}), Inputs=({inputs}), WorkUnits = {self.work_units}"
+
+#Returns the id for a recipe with the given building, outputs and inputs (e.g. "FORGE:iron_plate=1<-iron_ore=2")
+def CreateRecipeId(building: BUILDING, outputs: Mapping[ITEM, int], inputs: Mapping[ITEM, int]) -> str:
+    outputsStr = ",".join(f"{item.name}={amount}" for item, amount in outputs.items())
+    inputsStr = ",".join(f"{item.name}={amount}" for item, amount in inputs.items())
+    return f"{building.name}:{outputsStr}<-{inputsStr}"
 
-        result += f"), WorkUnits = {self.work_units}"
-        return result
+#Returns the recipe with the given id from the manager
+def GetRecipe(id: str) -> BaseRecipe:
+    return GetManager().GetById(id)
 
 #Class for managing recipes
 class RecipeManager():
     recipes: dict[ITEM, list[BaseRecipe]]
+    #Stores the items which are a non-primary output of at least one recipe
+    byproducts: set[ITEM]
+    #Maps from each recipe id to the recipe
+    byId: dict[str, BaseRecipe]
 
     def __init__(self):
         self.recipes = {}
+        self.byproducts = set()
+        self.byId = {}
     
     #Adds the given recipes with the given building
     def Add(self, building: BUILDING, recipes: list[BaseRecipe]):
         for recipe in recipes:
-            recipe.building = building
+            recipe.Freeze(building)
+            if recipe.id in self.byId:
+                raise ValueError(f"Recipe {recipe.id} already exists")
+            self.byId[recipe.id] = recipe
             outputs = recipe.outputs.keys()
+            self.byproducts.update(list(outputs)[1:])
             for output in outputs:
                 if not output in self.recipes:
                     self.recipes[output] = []
@@ -49,280 +89,80 @@ class RecipeManager():
             raise ValueError(f"There is no recipe for the {output}")
         return self.recipes[output]
     
+    #Returns the recipe with the given id
+    def GetById(self, id: str) -> BaseRecipe:
+        if id not in self.byId:
+            raise ValueError(f"There is no recipe with the id {id}")
+        return self.byId[id]
+    
     #Returns the recipes where the the given item it the primary (first) output
     def GetPrimary(self, output: ITEM) -> list[BaseRecipe]:
         if output not in self.recipes:
             raise ValueError(f"There is no recipe for the {output}")
         return [recipe for recipe in self.recipes[output] if next(iter(recipe.outputs)) == output]
 
-manager = RecipeManager()
-
-manager.Add(PRODUCER.MINE, [
-    BaseRecipe(outputs={NATURAL_RESOURCE.stone: 2}, inputs={}, work_units=4),
-    BaseRecipe(outputs={NATURAL_RESOURCE.coal: 1}, inputs={}, work_units=4),
-    BaseRecipe(outputs={NATURAL_RESOURCE.iron_ore: 1}, inputs={}, work_units=4),
-    BaseRecipe(outputs={NATURAL_RESOURCE.mana_shard: 1}, inputs={}, work_units=6),
-    BaseRecipe(outputs={NATURAL_RESOURCE.fire_stone: 4}, inputs={}, work_units=6),
-    BaseRecipe(outputs={NATURAL_RESOURCE.air_stone: 4}, inputs={}, work_units=6),
-    BaseRecipe(outputs={NATURAL_RESOURCE.water_stone: 4}, inputs={}, work_units=6),
-    BaseRecipe(outputs={NATURAL_RESOURCE.earth_stone: 4}, inputs={}, work_units=6),
-    BaseRecipe(outputs={NATURAL_RESOURCE.gold_ore: 1}, inputs={}, work_units=10)
-])
-
-manager.Add(PRODUCER.FORESTER, [
-    BaseRecipe(outputs={NATURAL_RESOURCE.wood: 1}, inputs={}, work_units=4),
-    BaseRecipe(outputs={NATURAL_RESOURCE.apple: 1}, inputs={}, work_units=2),
-    BaseRecipe(outputs={NATURAL_RESOURCE.pear: 1}, inputs={}, work_units=2),
-    BaseRecipe(outputs={NATURAL_RESOURCE.dragonfruit: 1}, inputs={}, work_units=4)
-])
-
-manager.Add(PRODUCER.FARM, [
-    BaseRecipe(outputs={NATURAL_RESOURCE.grain: 1}, inputs={}, work_units=2),
-    BaseRecipe(outputs={NATURAL_RESOURCE.herb: 1}, inputs={}, work_units=3),
-    BaseRecipe(outputs={NATURAL_RESOURCE.sugar: 1}, inputs={}, work_units=4),
-    BaseRecipe(outputs={NATURAL_RESOURCE.berries: 1}, inputs={}, work_units=2),
-    BaseRecipe(outputs={NATURAL_RESOURCE.carrot: 1}, inputs={}, work_units=3),
-    BaseRecipe(outputs={NATURAL_RESOURCE.potato: 1}, inputs={}, work_units=3),
-    BaseRecipe(outputs={NATURAL_RESOURCE.tomato: 1}, inputs={}, work_units=3),
-    BaseRecipe(outputs={NATURAL_RESOURCE.cotton: 1}, inputs={}, work_units=2),
-    BaseRecipe(outputs={NATURAL_RESOURCE.cactus_fruit: 1}, inputs={}, work_units=4),
-])
-
-manager.Add(CRAFTER.LUMBER_MILL, [
-    BaseRecipe(outputs={CRAFTING_ITEM.planks: 1}, inputs={NATURAL_RESOURCE.wood: 1}, work_units=3),
-    BaseRecipe(outputs={CRAFTING_ITEM.paper: 2}, inputs={NATURAL_RESOURCE.wood: 1, CRAFTING_ITEM.water: 1}, work_units=4),
-    BaseRecipe(outputs={CRAFTING_ITEM.fluid_pipe: 1}, inputs={NATURAL_RESOURCE.wood: 2}, work_units=2),
-])
-
-manager.Add(CRAFTER.FOOD_MILL, [
-    BaseRecipe(outputs={CRAFTING_ITEM.flour: 1}, inputs={NATURAL_RESOURCE.grain: 3}, work_units=4),
-    #Grain is the best recipe for animal feed (as it has better yield) and no reason not to use it even if already using carrots/potatoes
-    BaseRecipe(outputs={CRAFTING_ITEM.animal_feed: 1}, inputs={NATURAL_RESOURCE.grain: 2}, work_units=2),
-    #BaseRecipe(outputs={CRAFTING_ITEM.animal_feed: 1}, inputs={NATURAL_RESOURCE.carrot: 2}, work_units=2),
-    #BaseRecipe(outputs={CRAFTING_ITEM.animal_feed: 1}, inputs={NATURAL_RESOURCE.potato: 2}, work_units=2),
-])
-
-manager.Add(CRAFTER.WORKSHOP, [
-    BaseRecipe(outputs={CRAFTING_ITEM.wood_wheel: 1}, inputs={CRAFTING_ITEM.planks: 2}, work_units=5),
-    BaseRecipe(outputs={CRAFTING_ITEM.cloth: 1}, inputs={NATURAL_RESOURCE.cotton: 2}, work_units=4),
-    BaseRecipe(outputs={CRAFTING_ITEM.cloth: 1}, inputs={CRAFTING_ITEM.wool: 1}, work_units=4),
-    BaseRecipe(outputs={CRAFTING_ITEM.book: 1}, inputs={CRAFTING_ITEM.paper: 4, CRAFTING_ITEM.leather:1}, work_units=5),
-    BaseRecipe(outputs={CRAFTING_ITEM.book: 1}, inputs={CRAFTING_ITEM.paper: 4, CRAFTING_ITEM.cloth:2}, work_units=6),
-    BaseRecipe(outputs={CRAFTING_ITEM.wood_conveyor_belt: 1}, inputs={NATURAL_RESOURCE.wood: 2, CRAFTING_ITEM.planks:2}, work_units=4),
-    BaseRecipe(outputs={CRAFTING_ITEM.cloth_conveyor_belt: 1}, inputs={CRAFTING_ITEM.wood_conveyor_belt: 1, CRAFTING_ITEM.cloth:1}, work_units=4),
-    BaseRecipe(outputs={CRAFTING_ITEM.cloth_conveyor_belt: 1}, inputs={CRAFTING_ITEM.wood_wheel: 2, CRAFTING_ITEM.cloth:1}, work_units=6),
-    BaseRecipe(outputs={CRAFTING_ITEM.wooden_rail: 1}, inputs={CRAFTING_ITEM.planks: 2, NATURAL_RESOURCE.stone:2}, work_units=4),
-    BaseRecipe(outputs={CRAFTING_ITEM.reinforced_plank: 1}, inputs={CRAFTING_ITEM.planks: 1, CRAFTING_ITEM.iron_plate:1, CRAFTING_ITEM.nails:2}, work_units=6),
-    BaseRecipe(outputs={CRAFTING_ITEM.wood_axe: 1}, inputs={CRAFTING_ITEM.planks: 1, CRAFTING_ITEM.iron_plate:1}, work_units=8),
-    BaseRecipe(outputs={CRAFTING_ITEM.pickaxe: 1}, inputs={CRAFTING_ITEM.reinforced_plank: 1, CRAFTING_ITEM.iron_plate:1}, work_units=12),
-])
-
-manager.Add(CRAFTER.TAILOR, [
-    BaseRecipe(outputs={CRAFTING_ITEM.shirt: 1}, inputs={CRAFTING_ITEM.cloth: 2}, work_units=4),
-    BaseRecipe(outputs={CRAFTING_ITEM.cloak: 1}, inputs={CRAFTING_ITEM.cloth: 2, CRAFTING_ITEM.leather:2}, work_units=4),
-    BaseRecipe(outputs={CRAFTING_ITEM.warm_coat: 1}, inputs={CRAFTING_ITEM.wool: 2, CRAFTING_ITEM.leather:1, CRAFTING_ITEM.shirt:1}, work_units=12),
-    BaseRecipe(outputs={CRAFTING_ITEM.shoe: 1}, inputs={CRAFTING_ITEM.nails: 2, CRAFTING_ITEM.leather:2}, work_units=5),
-])
-
-manager.Add(CRAFTER.STONE_MASON, [
-    BaseRecipe(outputs={CRAFTING_ITEM.stone_brick: 1}, inputs={NATURAL_RESOURCE.stone: 3}, work_units=4),
-    BaseRecipe(outputs={CRAFTING_ITEM.polished_stone: 1}, inputs={NATURAL_RESOURCE.stone: 10}, work_units=10),
-])
-
-manager.Add(CRAFTER.PASTURE, [
-    BaseRecipe(outputs={CRAFTING_ITEM.egg: 1}, inputs={CRAFTING_ITEM.animal_feed: 1}, work_units=3),
-    BaseRecipe(outputs={CRAFTING_ITEM.raw_chicken: 1}, inputs={CRAFTING_ITEM.animal_feed: 2}, work_units=5),
-    BaseRecipe(outputs={CRAFTING_ITEM.fertilizer: 1}, inputs={CRAFTING_ITEM.animal_feed: 1, CRAFTING_ITEM.water:1}, work_units=3),
-    BaseRecipe(outputs={CRAFTING_ITEM.wool: 1, CRAFTING_ITEM.fertilizer: 1}, inputs={CRAFTING_ITEM.animal_feed: 2, CRAFTING_ITEM.water:2}, work_units=6),
-    BaseRecipe(outputs={CRAFTING_ITEM.leather: 1, CRAFTING_ITEM.fertilizer: 1}, inputs={CRAFTING_ITEM.animal_feed: 4, CRAFTING_ITEM.water:4}, work_units=8),
-    BaseRecipe(outputs={CRAFTING_ITEM.beef: 1, CRAFTING_ITEM.fertilizer: 1}, inputs={CRAFTING_ITEM.animal_feed: 4, CRAFTING_ITEM.water:4}, work_units=10),
-    BaseRecipe(outputs={CRAFTING_ITEM.milk: 1, CRAFTING_ITEM.fertilizer: 1}, inputs={CRAFTING_ITEM.animal_feed: 2, CRAFTING_ITEM.water:2}, work_units=2),
-])
-
-manager.Add(CRAFTER.FORGE, [
-    BaseRecipe(outputs={CRAFTING_ITEM.iron_plate: 1}, inputs={NATURAL_RESOURCE.iron_ore: 2, CRAFTING_ITEM.fuel:2}, work_units=6),
-    BaseRecipe(outputs={CRAFTING_ITEM.gold_ingot: 1}, inputs={NATURAL_RESOURCE.gold_ore: 4, CRAFTING_ITEM.fuel:4}, work_units=8),
-    BaseRecipe(outputs={CRAFTING_ITEM.nails: 1}, inputs={NATURAL_RESOURCE.iron_ore: 1, CRAFTING_ITEM.fuel:1}, work_units=3),
-    BaseRecipe(outputs={CRAFTING_ITEM.steam_pipe: 1}, inputs={NATURAL_RESOURCE.iron_ore: 1, CRAFTING_ITEM.fuel:1}, work_units=3),
-])
-
-manager.Add(CONVERTER.FUEL, [
-    BaseRecipe(outputs={CRAFTING_ITEM.fuel: 1}, inputs={CRAFTING_ITEM.fertilizer: 1}, work_units=0),
-    BaseRecipe(outputs={CRAFTING_ITEM.fuel: 2}, inputs={NATURAL_RESOURCE.wood: 1}, work_units=0),
-    BaseRecipe(outputs={CRAFTING_ITEM.fuel: 4}, inputs={NATURAL_RESOURCE.coal: 1}, work_units=0),
-    BaseRecipe(outputs={CRAFTING_ITEM.fuel: 8}, inputs={CRAFTING_ITEM.magma: 1}, work_units=0),
-])
-
-manager.Add(CRAFTER.KITCHEN, [
-    BaseRecipe(outputs={CRAFTING_ITEM.bread: 1}, inputs={CRAFTING_ITEM.flour: 2, CRAFTING_ITEM.fuel:1}, work_units=4),
-    BaseRecipe(outputs={CRAFTING_ITEM.cooked_beef: 1}, inputs={CRAFTING_ITEM.beef: 1, CRAFTING_ITEM.fuel:1}, work_units=5),
-    BaseRecipe(outputs={CRAFTING_ITEM.cooken_chicken: 1}, inputs={CRAFTING_ITEM.raw_chicken: 1, CRAFTING_ITEM.fuel:1}, work_units=5),
-    BaseRecipe(outputs={CRAFTING_ITEM.cooked_fish: 1}, inputs={NATURAL_RESOURCE.fish: 1, CRAFTING_ITEM.fuel:1}, work_units=5),
-    BaseRecipe(outputs={CRAFTING_ITEM.apple_juice: 1}, inputs={NATURAL_RESOURCE.apple: 2}, work_units=3),
-    BaseRecipe(outputs={CRAFTING_ITEM.pear_juice: 1}, inputs={NATURAL_RESOURCE.pear: 2}, work_units=3),
-    BaseRecipe(outputs={CRAFTING_ITEM.berry_juice: 1}, inputs={NATURAL_RESOURCE.berries: 2}, work_units=3),
-    BaseRecipe(outputs={CRAFTING_ITEM.apple_jam: 1}, inputs={NATURAL_RESOURCE.apple: 4, NATURAL_RESOURCE.sugar:1, CRAFTING_ITEM.fuel:1}, work_units=5),
-    BaseRecipe(outputs={CRAFTING_ITEM.pear_jam: 1}, inputs={NATURAL_RESOURCE.pear: 4, NATURAL_RESOURCE.sugar:1, CRAFTING_ITEM.fuel:1}, work_units=5),
-    BaseRecipe(outputs={CRAFTING_ITEM.berry_jam: 1}, inputs={NATURAL_RESOURCE.berries: 4, NATURAL_RESOURCE.sugar:1, CRAFTING_ITEM.fuel:1}, work_units=5),
-    BaseRecipe(outputs={CRAFTING_ITEM.dragon_punch: 1}, inputs={NATURAL_RESOURCE.dragonfruit: 1, CRAFTING_ITEM.berry_juice:1, CRAFTING_ITEM.apple_juice:1}, work_units=4),
-    BaseRecipe(outputs={CRAFTING_ITEM.cactus_jam: 1}, inputs={NATURAL_RESOURCE.cactus_fruit: 1, CRAFTING_ITEM.pear_juice:1, NATURAL_RESOURCE.sugar:1, CRAFTING_ITEM.fuel:2}, work_units=4),
-    BaseRecipe(outputs={CRAFTING_ITEM.butter: 1}, inputs={CRAFTING_ITEM.milk: 2}, work_units=5),
-    BaseRecipe(outputs={CRAFTING_ITEM.cheese: 2}, inputs={CRAFTING_ITEM.milk: 5, CRAFTING_ITEM.cloth:1}, work_units=10),
-    BaseRecipe(outputs={CRAFTING_ITEM.veggie_stew: 1}, inputs={NATURAL_RESOURCE.tomato: 1, NATURAL_RESOURCE.potato:1, NATURAL_RESOURCE.carrot:1, CRAFTING_ITEM.fuel:2}, work_units=6),
-    BaseRecipe(outputs={CRAFTING_ITEM.fish_stew: 1}, inputs={NATURAL_RESOURCE.fish: 1, NATURAL_RESOURCE.tomato:2, CRAFTING_ITEM.butter:1, CRAFTING_ITEM.fuel:2}, work_units=6),
-    BaseRecipe(outputs={CRAFTING_ITEM.meat_stew: 1}, inputs={NATURAL_RESOURCE.potato: 1, NATURAL_RESOURCE.carrot:1, CRAFTING_ITEM.cooked_beef:1, CRAFTING_ITEM.fuel:2}, work_units=6),
-    BaseRecipe(outputs={CRAFTING_ITEM.sandwich: 1}, inputs={CRAFTING_ITEM.bread: 1, CRAFTING_ITEM.cheese:1, CRAFTING_ITEM.cooken_chicken:1}, work_units=3),
-    BaseRecipe(outputs={CRAFTING_ITEM.apple_pie: 1}, inputs={CRAFTING_ITEM.flour:4, NATURAL_RESOURCE.sugar:2, CRAFTING_ITEM.butter:1, NATURAL_RESOURCE.apple:2, CRAFTING_ITEM.fuel:2}, work_units=10),
-    BaseRecipe(outputs={CRAFTING_ITEM.cake: 1}, inputs={CRAFTING_ITEM.flour:4, NATURAL_RESOURCE.sugar:2, CRAFTING_ITEM.butter:1, CRAFTING_ITEM.egg:2, CRAFTING_ITEM.fuel:2}, work_units=10),
-    BaseRecipe(outputs={CRAFTING_ITEM.berry_cake: 1}, inputs={CRAFTING_ITEM.cake:1, CRAFTING_ITEM.apple_jam:2, NATURAL_RESOURCE.sugar:2, NATURAL_RESOURCE.berries:4}, work_units=10),
-    BaseRecipe(outputs={CRAFTING_ITEM.bread: 1}, inputs={CRAFTING_ITEM.flour:1, NATURAL_RESOURCE.potato:1, CRAFTING_ITEM.fuel:1}, work_units=4),
-    BaseRecipe(outputs={CRAFTING_ITEM.protein_shake: 1}, inputs={CRAFTING_ITEM.milk:1, NATURAL_RESOURCE.sugar:1, CRAFTING_ITEM.egg:1}, work_units=6),
-])
-
-manager.Add(PRODUCER.FISHERY, [
-    BaseRecipe(outputs={NATURAL_RESOURCE.fish: 1}, inputs={}, work_units=4),
-])
-
-manager.Add(CRAFTER.MACHINE_SHOP, [
-    BaseRecipe(outputs={CRAFTING_ITEM.gear: 1}, inputs={CRAFTING_ITEM.iron_plate: 1}, work_units=10),
-    BaseRecipe(outputs={CRAFTING_ITEM.iron_wheel: 1}, inputs={CRAFTING_ITEM.iron_plate: 2}, work_units=10),
-    BaseRecipe(outputs={CRAFTING_ITEM.metal_rail: 1}, inputs={CRAFTING_ITEM.iron_plate: 2, CRAFTING_ITEM.wooden_rail:1}, work_units=4),
-    BaseRecipe(outputs={CRAFTING_ITEM.metal_rail: 1}, inputs={CRAFTING_ITEM.iron_plate: 2, CRAFTING_ITEM.planks:2, NATURAL_RESOURCE.stone:4}, work_units=6),
-    BaseRecipe(outputs={CRAFTING_ITEM.mechanical_rail: 1}, inputs={CRAFTING_ITEM.metal_rail: 1, CRAFTING_ITEM.gear:8}, work_units=8),
-    BaseRecipe(outputs={CRAFTING_ITEM.mechanical_rail: 1}, inputs={CRAFTING_ITEM.iron_plate: 4, CRAFTING_ITEM.planks:2, CRAFTING_ITEM.gear:8}, work_units=12),
-    BaseRecipe(outputs={CRAFTING_ITEM.metal_conveyor_belt: 1}, inputs={CRAFTING_ITEM.iron_plate: 2, CRAFTING_ITEM.cloth_conveyor_belt:1, CRAFTING_ITEM.gear:1}, work_units=6),
-    BaseRecipe(outputs={CRAFTING_ITEM.metal_conveyor_belt: 1}, inputs={CRAFTING_ITEM.iron_plate: 4, CRAFTING_ITEM.gear:2}, work_units=8),
-    BaseRecipe(outputs={CRAFTING_ITEM.nails: 2}, inputs={CRAFTING_ITEM.iron_plate: 1}, work_units=2),
-    BaseRecipe(outputs={CRAFTING_ITEM.steam_pipe: 2}, inputs={CRAFTING_ITEM.iron_plate: 1}, work_units=2),
-])
-
-manager.Add(CRAFTER.MEDICINE_HUT, [
-    BaseRecipe(outputs={CRAFTING_ITEM.bandage: 1}, inputs={CRAFTING_ITEM.cloth: 1}, work_units=5),
-    BaseRecipe(outputs={CRAFTING_ITEM.poultice: 1}, inputs={CRAFTING_ITEM.bandage: 1, NATURAL_RESOURCE.herb:2}, work_units=4),
-    BaseRecipe(outputs={CRAFTING_ITEM.medical_wrap: 1}, inputs={CRAFTING_ITEM.poultice: 1, CRAFTING_ITEM.ointment:1, CRAFTING_ITEM.cloth:1}, work_units=10),
-    BaseRecipe(outputs={CRAFTING_ITEM.remedy: 1}, inputs={NATURAL_RESOURCE.herb: 2, CRAFTING_ITEM.water:1, CRAFTING_ITEM.fuel:1}, work_units=6),
-    BaseRecipe(outputs={CRAFTING_ITEM.fish_oil: 1}, inputs={NATURAL_RESOURCE.fish: 1}, work_units=5),
-    BaseRecipe(outputs={CRAFTING_ITEM.ointment: 1}, inputs={NATURAL_RESOURCE.herb: 4, CRAFTING_ITEM.fish_oil:2}, work_units=8),
-    BaseRecipe(outputs={CRAFTING_ITEM.antidote: 1}, inputs={CRAFTING_ITEM.remedy: 2, CRAFTING_ITEM.fish_oil:1, NATURAL_RESOURCE.sugar:1}, work_units=12),
-    BaseRecipe(outputs={CRAFTING_ITEM.health_potion: 1, CRAFTING_ITEM.depleted_mana:1}, inputs={CRAFTING_ITEM.remedy: 2, CRAFTING_ITEM.apple_juice:1, CRAFTING_ITEM.mana_crystal:1}, work_units=6),
-    BaseRecipe(outputs={CRAFTING_ITEM.elixir: 1, CRAFTING_ITEM.depleted_water:2}, inputs={CRAFTING_ITEM.health_potion: 1, CRAFTING_ITEM.antidote:1, CRAFTING_ITEM.water_crystal:2}, work_units=10),
-])
-
-manager.Add(CRAFTER.STEAM_GENERATOR, [
-    BaseRecipe(outputs={CRAFTING_ITEM.steam: 2}, inputs={CRAFTING_ITEM.fuel:1, CRAFTING_ITEM.water:1}, work_units=1),
-])
-
-manager.Add(PASSIVE.WELL, [
-    BaseRecipe(outputs={CRAFTING_ITEM.water: 1}, inputs={}, work_units=2),
-])
-
-manager.Add(PASSIVE.WATER_PUMP, [
-    BaseRecipe(outputs={CRAFTING_ITEM.water: 2}, inputs={CRAFTING_ITEM.steam: 1}, work_units=1),
-    BaseRecipe(outputs={CRAFTING_ITEM.water: 2}, inputs={POWER.rotation_power: 1}, work_units=1),
-])
-
-manager.Add(CRAFTER.LABORATORY, [
-    BaseRecipe(outputs={CRAFTING_ITEM.natural_knowledge_tome_lv1: 1}, inputs={CRAFTING_ITEM.book: 1, NATURAL_RESOURCE.herb:2}, work_units=6),
-    BaseRecipe(outputs={CRAFTING_ITEM.natural_knowledge_tome_lv2: 1}, inputs={CRAFTING_ITEM.natural_knowledge_tome_lv1: 1, CRAFTING_ITEM.fish_oil:1, CRAFTING_ITEM.remedy:1}, work_units=8),
-    BaseRecipe(outputs={CRAFTING_ITEM.natural_knowledge_tome_lv3: 1}, inputs={CRAFTING_ITEM.natural_knowledge_tome_lv2: 1, CRAFTING_ITEM.health_potion:1, CRAFTING_ITEM.antidote:1}, work_units=10),
-    BaseRecipe(outputs={CRAFTING_ITEM.industrial_knowledge_tome_lv1: 1}, inputs={CRAFTING_ITEM.book: 1, CRAFTING_ITEM.iron_plate:2}, work_units=6),
-    BaseRecipe(outputs={CRAFTING_ITEM.industrial_knowledge_tome_lv2: 1}, inputs={CRAFTING_ITEM.industrial_knowledge_tome_lv1: 1, CRAFTING_ITEM.iron_wheel:1, CRAFTING_ITEM.steam_pipe:2}, work_units=8),
-    BaseRecipe(outputs={CRAFTING_ITEM.industrial_knowledge_tome_lv3: 1}, inputs={CRAFTING_ITEM.industrial_knowledge_tome_lv2: 1, CRAFTING_ITEM.metal_rail:1, CRAFTING_ITEM.metal_conveyor_belt:1}, work_units=10),
-])
-
-manager.Add(CRAFTER.MAGE_TOWER, [
-    BaseRecipe(outputs={CRAFTING_ITEM.magical_knowledge_tome_lv1: 1}, inputs={CRAFTING_ITEM.book: 1, CRAFTING_ITEM.mana_crystal:1, CRAFTING_ITEM.cloak:1}, work_units=6),
-    BaseRecipe(outputs={CRAFTING_ITEM.magical_knowledge_tome_lv2: 1}, inputs={CRAFTING_ITEM.magical_knowledge_tome_lv1: 1, CRAFTING_ITEM.mana_brick:1, CRAFTING_ITEM.mana_pipe:1}, work_units=8),
-    BaseRecipe(outputs={CRAFTING_ITEM.magical_knowledge_tome_lv3: 1}, inputs={CRAFTING_ITEM.magical_knowledge_tome_lv2: 1, CRAFTING_ITEM.magic_robe:1, CRAFTING_ITEM.ward:1}, work_units=10),
-    BaseRecipe(outputs={CRAFTING_ITEM.fire_knowledge_tome_lv1: 1}, inputs={CRAFTING_ITEM.enchanted_book: 1, CRAFTING_ITEM.fire_ether:4}, work_units=8),
-    BaseRecipe(outputs={CRAFTING_ITEM.fire_knowledge_tome_lv2: 1}, inputs={CRAFTING_ITEM.fire_knowledge_tome_lv1: 1, CRAFTING_ITEM.fire_crystal:1}, work_units=10),
-    BaseRecipe(outputs={CRAFTING_ITEM.fire_knowledge_tome_lv3: 1}, inputs={CRAFTING_ITEM.fire_knowledge_tome_lv2: 1, CRAFTING_ITEM.strength_spellbook:1}, work_units=12),
-    BaseRecipe(outputs={CRAFTING_ITEM.water_knowledge_tome_lv1: 1}, inputs={CRAFTING_ITEM.enchanted_book: 1, CRAFTING_ITEM.water_ether:4}, work_units=8),
-    BaseRecipe(outputs={CRAFTING_ITEM.water_knowledge_tome_lv2: 1}, inputs={CRAFTING_ITEM.water_knowledge_tome_lv1: 1, CRAFTING_ITEM.water_crystal:1}, work_units=10),
-    BaseRecipe(outputs={CRAFTING_ITEM.water_knowledge_tome_lv3: 1}, inputs={CRAFTING_ITEM.water_knowledge_tome_lv2: 1, CRAFTING_ITEM.cure_spellbook:1}, work_units=12),
-    BaseRecipe(outputs={CRAFTING_ITEM.earth_knowledge_tome_lv1: 1}, inputs={CRAFTING_ITEM.enchanted_book: 1, CRAFTING_ITEM.earth_ether:4}, work_units=8),
-    BaseRecipe(outputs={CRAFTING_ITEM.earth_knowledge_tome_lv2: 1}, inputs={CRAFTING_ITEM.earth_knowledge_tome_lv1: 1, CRAFTING_ITEM.earth_crystal:1}, work_units=10),
-    BaseRecipe(outputs={CRAFTING_ITEM.earth_knowledge_tome_lv3: 1}, inputs={CRAFTING_ITEM.earth_knowledge_tome_lv2: 1, CRAFTING_ITEM.protection_spellbook:1}, work_units=12),
-    BaseRecipe(outputs={CRAFTING_ITEM.air_knowledge_tome_lv1: 1}, inputs={CRAFTING_ITEM.enchanted_book: 1, CRAFTING_ITEM.air_ether:4}, work_units=8),
-    BaseRecipe(outputs={CRAFTING_ITEM.air_knowledge_tome_lv2: 1}, inputs={CRAFTING_ITEM.air_knowledge_tome_lv1: 1, CRAFTING_ITEM.air_crystal:1}, work_units=10),
-    BaseRecipe(outputs={CRAFTING_ITEM.air_knowledge_tome_lv3: 1}, inputs={CRAFTING_ITEM.air_knowledge_tome_lv2: 1, CRAFTING_ITEM.stamina_spellbook:1}, work_units=12),
-])
-
-manager.Add(PASSIVE.STEAM_ENGINE, [
-    BaseRecipe(outputs={POWER.rotation_power: 2}, inputs={CRAFTING_ITEM.steam:1}, work_units=1),
-])
-
-manager.Add(CRAFTER.MAGIC_FORGE, [
-    BaseRecipe(outputs={CRAFTING_ITEM.mana_crystal: 1}, inputs={NATURAL_RESOURCE.mana_shard:2, CRAFTING_ITEM.fuel:10}, work_units=8),
-    BaseRecipe(outputs={CRAFTING_ITEM.mana_brick: 1}, inputs={CRAFTING_ITEM.stone_brick:1, CRAFTING_ITEM.mana_crystal:1, CRAFTING_ITEM.fuel:12}, work_units=10),
-    BaseRecipe(outputs={CRAFTING_ITEM.mana_pipe: 4}, inputs={CRAFTING_ITEM.steam_pipe:1, CRAFTING_ITEM.mana_crystal:1, CRAFTING_ITEM.fuel:8}, work_units=6),
-    BaseRecipe(outputs={CRAFTING_ITEM.omnipipe: 2}, inputs={CRAFTING_ITEM.mana_pipe:2, CRAFTING_ITEM.omnistone:1, CRAFTING_ITEM.fuel:20}, work_units=10),
-])
-
-manager.Add(CRAFTER.ELEMENTAL_REFINERY, [
-    BaseRecipe(outputs={CRAFTING_ITEM.fire_ether:4, CRAFTING_ITEM.depleted_mana:1}, inputs={NATURAL_RESOURCE.fire_stone:4, CRAFTING_ITEM.mana_crystal:1}, work_units=10),
-    BaseRecipe(outputs={CRAFTING_ITEM.water_ether:4, CRAFTING_ITEM.depleted_mana:1}, inputs={NATURAL_RESOURCE.water_stone:4, CRAFTING_ITEM.mana_crystal:1}, work_units=10),
-    BaseRecipe(outputs={CRAFTING_ITEM.earth_ether:4, CRAFTING_ITEM.depleted_mana:1}, inputs={NATURAL_RESOURCE.earth_stone:4, CRAFTING_ITEM.mana_crystal:1}, work_units=10),
-    BaseRecipe(outputs={CRAFTING_ITEM.air_ether:4, CRAFTING_ITEM.depleted_mana:1}, inputs={NATURAL_RESOURCE.air_stone:4, CRAFTING_ITEM.mana_crystal:1}, work_units=10),
-])
-
-manager.Add(CRAFTER.ENCHANTER, [
-    BaseRecipe(outputs={CRAFTING_ITEM.ward:1, CRAFTING_ITEM.depleted_mana:1}, inputs={CRAFTING_ITEM.reinforced_plank:1, CRAFTING_ITEM.polished_stone:1, CRAFTING_ITEM.mana_crystal:1}, work_units=10),
-    BaseRecipe(outputs={CRAFTING_ITEM.magic_cloak:1, CRAFTING_ITEM.depleted_mana:2}, inputs={CRAFTING_ITEM.cloak:1, CRAFTING_ITEM.wool:1, CRAFTING_ITEM.mana_crystal:2}, work_units=6),
-    BaseRecipe(outputs={CRAFTING_ITEM.magic_robe:1, CRAFTING_ITEM.depleted_mana:2}, inputs={CRAFTING_ITEM.shirt:1, CRAFTING_ITEM.leather:1, CRAFTING_ITEM.mana_crystal:2}, work_units=6),
-    BaseRecipe(outputs={CRAFTING_ITEM.fire_ring:1, CRAFTING_ITEM.depleted_fire:2}, inputs={CRAFTING_ITEM.gold_ingot:1, CRAFTING_ITEM.polished_stone:2, CRAFTING_ITEM.fire_crystal:2}, work_units=6),
-    BaseRecipe(outputs={CRAFTING_ITEM.water_ring:1, CRAFTING_ITEM.depleted_water:2}, inputs={CRAFTING_ITEM.gold_ingot:1, CRAFTING_ITEM.polished_stone:2, CRAFTING_ITEM.water_crystal:2}, work_units=6),
-    BaseRecipe(outputs={CRAFTING_ITEM.crown:1, CRAFTING_ITEM.depleted_air:2}, inputs={CRAFTING_ITEM.gold_ingot:2, CRAFTING_ITEM.iron_plate:2, CRAFTING_ITEM.air_crystal:2}, work_units=6),
-    BaseRecipe(outputs={CRAFTING_ITEM.necklace:1, CRAFTING_ITEM.depleted_earth:2}, inputs={CRAFTING_ITEM.polished_stone:2, CRAFTING_ITEM.iron_plate:2, CRAFTING_ITEM.earth_crystal:2}, work_units=6),
-    BaseRecipe(outputs={CRAFTING_ITEM.magic_rail:1, CRAFTING_ITEM.depleted_fire:1}, inputs={CRAFTING_ITEM.metal_rail:1, CRAFTING_ITEM.fire_crystal:1}, work_units=10),
-    BaseRecipe(outputs={CRAFTING_ITEM.magic_conveyor_belt:1, CRAFTING_ITEM.depleted_air:1}, inputs={CRAFTING_ITEM.metal_conveyor_belt:1, CRAFTING_ITEM.air_crystal:1}, work_units=10),
-    BaseRecipe(outputs={CRAFTING_ITEM.enchanted_book:1, CRAFTING_ITEM.depleted_mana:1}, inputs={CRAFTING_ITEM.book:1, CRAFTING_ITEM.mana_crystal:1}, work_units=8),
-    BaseRecipe(outputs={CRAFTING_ITEM.strength_spellbook:1, CRAFTING_ITEM.depleted_fire:2}, inputs={CRAFTING_ITEM.enchanted_book:1, CRAFTING_ITEM.fire_crystal:2}, work_units=10),
-    BaseRecipe(outputs={CRAFTING_ITEM.stamina_spellbook:1, CRAFTING_ITEM.depleted_air:2}, inputs={CRAFTING_ITEM.enchanted_book:1, CRAFTING_ITEM.air_crystal:2}, work_units=10),
-    BaseRecipe(outputs={CRAFTING_ITEM.cure_spellbook:1, CRAFTING_ITEM.depleted_water:2}, inputs={CRAFTING_ITEM.enchanted_book:1, CRAFTING_ITEM.water_crystal:2}, work_units=10),
-    BaseRecipe(outputs={CRAFTING_ITEM.protection_spellbook:1, CRAFTING_ITEM.depleted_earth:2}, inputs={CRAFTING_ITEM.enchanted_book:1, CRAFTING_ITEM.earth_crystal:2}, work_units=10),
-])
-
-manager.Add(PASSIVE.RECHARGER, [
-    BaseRecipe(outputs={CRAFTING_ITEM.mana_crystal:1}, inputs={CRAFTING_ITEM.depleted_mana:1}, work_units=6),
-    BaseRecipe(outputs={CRAFTING_ITEM.fire_crystal:1}, inputs={CRAFTING_ITEM.depleted_fire:1}, work_units=6),
-    BaseRecipe(outputs={CRAFTING_ITEM.water_crystal:1}, inputs={CRAFTING_ITEM.depleted_water:1}, work_units=6),
-    BaseRecipe(outputs={CRAFTING_ITEM.earth_crystal:1}, inputs={CRAFTING_ITEM.depleted_earth:1}, work_units=6),
-    BaseRecipe(outputs={CRAFTING_ITEM.air_crystal:1}, inputs={CRAFTING_ITEM.depleted_air:1}, work_units=6),
-])
-
-manager.Add(PASSIVE.FIRE_SHRINE, [
-    BaseRecipe(outputs={CRAFTING_ITEM.magma:1, CRAFTING_ITEM.depleted_fire:1}, inputs={CRAFTING_ITEM.fire_crystal:1}, work_units=1),
-    BaseRecipe(outputs={POWER.fire_boost:1, CRAFTING_ITEM.depleted_fire:1}, inputs={CRAFTING_ITEM.fire_crystal:1}, work_units=1),
-])
-
-manager.Add(PASSIVE.WATER_SHRINE, [
-    BaseRecipe(outputs={CRAFTING_ITEM.water:4, CRAFTING_ITEM.depleted_water:1}, inputs={CRAFTING_ITEM.water_crystal:1}, work_units=1),
-    BaseRecipe(outputs={POWER.water_boost:1, CRAFTING_ITEM.depleted_water:1}, inputs={CRAFTING_ITEM.water_crystal:1}, work_units=1),
-])
-
-manager.Add(PASSIVE.AIR_SHRINE, [
-    BaseRecipe(outputs={POWER.air_boost:1, CRAFTING_ITEM.depleted_air:1}, inputs={CRAFTING_ITEM.air_crystal:1}, work_units=1),
-    BaseRecipe(outputs={POWER.worker_speed_boost:1, CRAFTING_ITEM.depleted_air:1}, inputs={CRAFTING_ITEM.air_crystal:1}, work_units=1),
-])
-
-manager.Add(PASSIVE.EARTH_SHRINE, [
-    BaseRecipe(outputs={POWER.earth_boost:1, CRAFTING_ITEM.depleted_earth:1}, inputs={CRAFTING_ITEM.earth_crystal:1}, work_units=1),
-    BaseRecipe(outputs={POWER.regen_boost:1, CRAFTING_ITEM.depleted_earth:1}, inputs={CRAFTING_ITEM.earth_crystal:1}, work_units=1),
-])
-
-manager.Add(PASSIVE.FIRE_TEMPLE, [
-    BaseRecipe(outputs={CRAFTING_ITEM.fire_crystal:1}, inputs={CRAFTING_ITEM.fire_ether:8, CRAFTING_ITEM.mana_crystal:2}, work_units=10),
-])
-
-manager.Add(PASSIVE.WATER_TEMPLE, [
-    BaseRecipe(outputs={CRAFTING_ITEM.water_crystal:1}, inputs={CRAFTING_ITEM.water_ether:8, CRAFTING_ITEM.mana_crystal:2}, work_units=10),
-])
-
-manager.Add(PASSIVE.AIR_TEMPLE, [
-    BaseRecipe(outputs={CRAFTING_ITEM.air_crystal:1}, inputs={CRAFTING_ITEM.air_ether:8, CRAFTING_ITEM.mana_crystal:2}, work_units=10),
-])
-
-manager.Add(PASSIVE.EARTH_TEMPLE, [
-    BaseRecipe(outputs={CRAFTING_ITEM.earth_crystal:1}, inputs={CRAFTING_ITEM.earth_ether:8, CRAFTING_ITEM.mana_crystal:2}, work_units=10),
-])
\ No newline at end of file
+#The recipes are loaded from data/Recipes.json, a list of buildings and their recipes (in the order they're added to the manager)
+RECIPES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "Recipes.json")
+
+#Returns the user's cache directory for this program, so compiled data isn't written next to the code (which may not be writable)
+def GetUserCacheDirectory() -> str:
+    if os.name == "nt" and "LOCALAPPDATA" in os.environ:
+        base = os.environ["LOCALAPPDATA"]
+    else:
+        base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "FactoryTown")
+
+#The compiled recipe data, a pickle of the JSON data which is remade whenever the JSON file changes
+COMPILED_RECIPES_PATH = os.path.join(GetUserCacheDirectory(), "Recipes.pickle")
+
+#Returns the recipe data from the given JSON file as a list of (building name, [(outputs, inputs, work units)])
+#Uses the compiled recipe data if it was made from the current JSON file, otherwise the JSON file is parsed and compiled
+def LoadRecipeData(path: str = RECIPES_PATH, compiledPath: str | None = COMPILED_RECIPES_PATH) -> list[tuple[str, list[tuple[dict[str, int], dict[str, int], int]]]]:
+    #The compiled data can be shared by several copies of the program, so it's keyed by the JSON file's path as well
+    stat = os.stat(path)
+    source = (os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+    if compiledPath:
+        try:
+            with open(compiledPath, "rb") as file:
+                compiledSource, data = pickle.load(file)
+            if compiledSource == source:
+                return data
+        except (OSError, pickle.UnpicklingError, EOFError, ValueError, TypeError):
+            pass
+
+    with open(path, encoding="utf-8") as file:
+        data = [(group["building"], [(recipe["outputs"], recipe["inputs"], recipe["work_units"]) for recipe in group["recipes"]]) for group in json.load(file)]
+
+    if compiledPath:
+        #The compiled data is only a cache, so it doesn't matter if it can't be written
+        try:
+            os.makedirs(os.path.dirname(compiledPath), exist_ok=True)
+            with open(f"{compiledPath}.{os.getpid()}.tmp", "wb") as file:
+                pickle.dump((source, data), file, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(f"{compiledPath}.{os.getpid()}.tmp", compiledPath)
+        except OSError:
+            pass
+    return data
+
+#Creates a recipe manager with the recipes from the given JSON file
+def LoadRecipes(path: str = RECIPES_PATH, compiledPath: str | None = COMPILED_RECIPES_PATH) -> RecipeManager:
+    loadedManager = RecipeManager()
+    for buildingName, recipes in LoadRecipeData(path, compiledPath):
+        loadedManager.Add(GetBuilding(buildingName), [BaseRecipe(outputs={GetItem(name): quantity for name, quantity in outputs.items()},
+                                                                 inputs={GetItem(name): quantity for name, quantity in inputs.items()},
+                                                                 work_units=work_units) for outputs, inputs, work_units in recipes])
+    return loadedManager
+
+#Returns the recipe manager, the recipes are loaded the first time it's needed
+def GetManager() -> RecipeManager:
+    global manager
+    if "manager" not in globals():
+        manager = LoadRecipes()
+    return manager
+
+#The recipe manager (Recipe.manager) is only created when it's first used, so importing this module doesn't load every recipe
+#After that it's a normal module attribute
+def __getattr__(name: str) -> Any:
+    if name == "manager":
+        return GetManager()
+    raise AttributeError(f"module {__name__} has no attribute {name}")
@@ -1,12 +1,13 @@
-import ProductionLine
+import ProductionLine, LineCache
 from Items import *
 
 def main():
     targetItem = CRAFTING_ITEM.pickaxe
-    productionLines = ProductionLine.GetProductionLines(targetItem)
+    #Cached on disk, so analysing the same item again doesn't need to evaluate the production lines again
+    productionLines = LineCache.GetProductionLines(targetItem)
 
     #Sort by number of workers
-    productionLines.sort(key=lambda x: (ProductionLine.SortByWorkers(x), ProductionLine.SortByRequired(x, NATURAL_RESOURCE.iron_ore), ProductionLine.SortByBuildings(x)))
+    productionLines.sort(key=ProductionLine.SortByDefault)
 
     ProductionLine.WriteValidChains(targetItem, productionLines)
 
@@ -18,5 +19,4 @@ if __name__ == "__main__":
 #TODO:
 # - Select a production line
 # - Re-calculate with target production
-# - Calculate conveyors for each recipes I/O
-# - For NATURAL_RESOURCE/producers, calculate number of buildings and nodes (link up with Producers.py)
\ No newline at end of file
+# - Calculate conveyors for each recipes I/O
\ No newline at end of file
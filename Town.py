@@ -0,0 +1,84 @@
+import Happiness, Speciality, Buildings
+from typing import Any
+
+#The highest town level that changes a speciality production boost
+MAX_TOWN_LEVEL = 10
+#The happiness used when no town state is given
+DEFAULT_HAPPINESS = 1400
+
+#The state of the town that production depends on: the happiness, the town level for each speciality and the buildings that are unlocked
+#Town states are immutable so they can be shared between production lines and used as cache keys
+class TownState():
+    __slots__ = ("happiness", "productionBoost", "townLevels", "unlockedBuildings", "key")
+
+    happiness: int
+    #Stores the production boost from the happiness
+    productionBoost: float
+    #Stores the town level for each speciality (specialities not given are at MAX_TOWN_LEVEL)
+    townLevels: dict[Speciality.SPECIALITY, int]
+    #Stores the buildings that are unlocked (None if every building is unlocked)
+    unlockedBuildings: frozenset[Buildings.BUILDING] | None
+    #Stores the values identifying this town state
+    key: tuple
+
+    def __init__(self, happiness: int = DEFAULT_HAPPINESS, townLevels: dict[Speciality.SPECIALITY, int] | int | None = None, unlockedBuildings: Any = None) -> None:
+        #A single town level is used for every speciality
+        if isinstance(townLevels, int):
+            townLevels = {speciality: townLevels for speciality in Speciality.SPECIALITY}
+        #Levels above the max don't boost any further, so they're the same state
+        townLevels = {speciality: level for speciality, level in (townLevels or dict()).items() if level < MAX_TOWN_LEVEL}
+
+        object.__setattr__(self, "happiness", happiness)
+        object.__setattr__(self, "productionBoost", Happiness.GetProductionBoost(happiness))
+        object.__setattr__(self, "townLevels", townLevels)
+        object.__setattr__(self, "unlockedBuildings", frozenset(unlockedBuildings) if unlockedBuildings is not None else None)
+        object.__setattr__(self, "key", (happiness, tuple(sorted((speciality.name, level) for speciality, level in townLevels.items())),
+                                         tuple(sorted(building.name for building in self.unlockedBuildings)) if self.unlockedBuildings is not None else None))
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise AttributeError("Town states can't be changed, create a new one")
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, TownState) and self.key == other.key
+
+    def __hash__(self) -> int:
+        return hash(self.key)
+
+    def __reduce__(self):
+        return (TownState, (self.happiness, self.townLevels, self.unlockedBuildings))
+
+    def __str__(self) -> str:
+        return f"Happiness: {self.happiness}, Town levels: {self.townLevels}, Unlocked buildings: {self.unlockedBuildings}"
+
+    #Returns the production boost from the happiness
+    def GetProductionBoost(self) -> float:
+        return self.productionBoost
+
+    #Returns the town level for the given speciality
+    def GetTownLevel(self, speciality: Speciality.SPECIALITY) -> int:
+        if not self.townLevels:
+            return MAX_TOWN_LEVEL
+        return self.townLevels.get(speciality, MAX_TOWN_LEVEL)
+
+    #Returns whether the given building is unlocked
+    def IsUnlocked(self, building: Buildings.BUILDING) -> bool:
+        return self.unlockedBuildings is None or building in self.unlockedBuildings
+
+    #Returns the town state as a dict of names so it can be saved as JSON
+    def ToDict(self) -> dict[str, Any]:
+        return {
+            "happiness": self.happiness,
+            "townLevels": {speciality.name: level for speciality, level in self.townLevels.items()},
+            "unlockedBuildings": sorted(building.name for building in self.unlockedBuildings) if self.unlockedBuildings is not None else None
+        }
+
+    #Creates the town state from the result of ToDict
+    @staticmethod
+    def FromDict(data: dict[str, Any]):
+        unlockedBuildings = None
+        if data["unlockedBuildings"] is not None:
+            unlockedBuildings = [Buildings.GetBuilding(name) for name in data["unlockedBuildings"]]
+        return TownState(data["happiness"], {Speciality.SPECIALITY[name]: level for name, level in data["townLevels"].items()}, unlockedBuildings)
+
+#The town state used when none is given (the current happiness and the max town level)
+defaultState = TownState()
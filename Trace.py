@@ -0,0 +1,100 @@
+from Items import *
+from array import array
+from typing import Any, Iterator
+import csv
+
+#Records how the item data of a production line changes while it's calculated, to see which items converge slowly or diverge
+#Pass a ConvergenceTrace to ProductionLine.CalculateItemData (iterative solver only), it's not recorded otherwise
+#Each row is the required and achieved amounts of an item after an update changed them, stored in columns so long traces stay compact
+
+class ConvergenceTrace():
+    #Stores the items in the order they were first recorded, rows refer to them by index
+    items: list[ITEM]
+    itemIndex: dict[ITEM, int]
+
+    #Stores the columns of each row
+    #The cycle of the update
+    cycles: array
+    #The index of the item the row is for
+    itemIds: array
+    #The index of the item whose update changed it (-1 for the outputs of the production line)
+    sources: array
+    #The total amount of the item required and achieved after the update
+    required: array
+    achieved: array
+
+    def __init__(self) -> None:
+        self.items = []
+        self.itemIndex = dict()
+        self.cycles = array('l')
+        self.itemIds = array('l')
+        self.sources = array('l')
+        self.required = array('d')
+        self.achieved = array('d')
+
+    def __len__(self) -> int:
+        return len(self.cycles)
+
+    #Returns the index of the given item, adding it if it hasn't been recorded before
+    def GetItemIndex(self, item: ITEM) -> int:
+        if item not in self.itemIndex:
+            self.itemIndex[item] = len(self.items)
+            self.items.append(item)
+        return self.itemIndex[item]
+
+    #Records the current required and achieved amounts of the given item, changed by the update of the source item (None for the outputs)
+    def Record(self, cycle: int, item: ITEM, source: ITEM | None, required: float, achieved: float):
+        self.cycles.append(cycle)
+        self.itemIds.append(self.GetItemIndex(item))
+        self.sources.append(-1 if source is None else self.GetItemIndex(source))
+        self.required.append(required)
+        self.achieved.append(achieved)
+
+    #Yields each row as (cycle, item, source item, required, achieved)
+    def GetRows(self) -> Iterator[tuple[int, ITEM, ITEM | None, float, float]]:
+        for cycle, itemId, source, required, achieved in zip(self.cycles, self.itemIds, self.sources, self.required, self.achieved):
+            yield cycle, self.items[itemId], None if source == -1 else self.items[source], required, achieved
+
+    #Returns the rows for the given item as (cycle, required, achieved)
+    def GetItemHistory(self, item: ITEM) -> list[tuple[int, float, float]]:
+        if item not in self.itemIndex:
+            return []
+        itemId = self.itemIndex[item]
+        return [(self.cycles[i], self.required[i], self.achieved[i]) for i in range(len(self.cycles)) if self.itemIds[i] == itemId]
+
+    #Returns the last cycle each item was changed in, slowest converging first
+    def GetConvergenceCycles(self) -> dict[ITEM, int]:
+        lastCycles: dict[ITEM, int] = dict()
+        for cycle, itemId in zip(self.cycles, self.itemIds):
+            lastCycles[self.items[itemId]] = cycle
+        return dict(sorted(lastCycles.items(), key=lambda x: x[1], reverse=True))
+
+    #Returns the columns, with the items as their names
+    def ToDict(self) -> dict[str, Any]:
+        return {
+            "items": [item.name for item in self.items],
+            "cycles": self.cycles.tolist(),
+            "itemIds": self.itemIds.tolist(),
+            "sources": self.sources.tolist(),
+            "required": self.required.tolist(),
+            "achieved": self.achieved.tolist()
+        }
+
+    #Writes the rows to the given CSV file, with the items as their names
+    def WriteCSV(self, path: str):
+        with open(path, "w", newline="") as file:
+            writer = csv.writer(file)
+            writer.writerow(["cycle", "item", "source", "required", "achieved"])
+            for cycle, item, source, required, achieved in self.GetRows():
+                writer.writerow([cycle, item.name, source.name if source else "", required, achieved])
+
+    #Writes the columns to the given NumPy .npz file, the item and source columns are indexes into the items array
+    def WriteNPZ(self, path: str):
+        import numpy as np #Only NPZ exports need NumPy
+        np.savez_compressed(path,
+                            items=np.array([item.name for item in self.items]),
+                            cycles=np.frombuffer(self.cycles, dtype=f"i{self.cycles.itemsize}"),
+                            itemIds=np.frombuffer(self.itemIds, dtype=f"i{self.itemIds.itemsize}"),
+                            sources=np.frombuffer(self.sources, dtype=f"i{self.sources.itemsize}"),
+                            required=np.frombuffer(self.required, dtype=np.float64),
+                            achieved=np.frombuffer(self.achieved, dtype=np.float64))
@@ -1,7 +1,9 @@
 from enum import Enum
-import Happiness
+import Happiness, Town
+import functools, json, os
 from Buildings import *
 from Items import *
+from typing import Any
 
 class SUPPLIER(Enum):
     WORKER_TYPE_1 = 1
@@ -14,97 +16,50 @@ class SUPPLIER(Enum):
     PASTURE_UPGRADE = 8
     PASSIVE = 9
 
+#The supplier data is loaded from data/Suppliers.json
+SUPPLIERS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "Suppliers.json")
+
+#The supplier data is only loaded when it's first used (by these functions or as a module attribute), so importing this module doesn't read it
 #Stores stats about each supplier
-supplier_stats = {
-    SUPPLIER.WORKER_TYPE_1: {
-        "resource": "Worker",
-        "work_units": { "base": 0, "per_increment": 1 + Happiness.GetCurrentProductionBoost() },
-        "max": 10,
-        "min": 1
-    },
-    SUPPLIER.WORKER_TYPE_2: {
-        "resource": "Worker",
-        "work_units": { "base": 0.5, "per_increment": 0.5 + Happiness.GetCurrentProductionBoost() },
-        "max": 5,
-        "min": 1
-    },
-    SUPPLIER.STEAM: {
-        "resource": CRAFTING_ITEM.steam,
-        "work_units": { "base": 1, "per_increment": 1 },
-        "max": 2
-    },
-    SUPPLIER.YELLOW_COIN: {
-        "resource": "Yellow Coin",
-        "increment": 0.5,
-        "work_units": { "base": 0, "per_increment": 1 },
-        "max": 10
-    },
-    SUPPLIER.RED_COIN: {
-        "resource": "Red Coin",
-        "increment": 0.25,
-        "work_units": { "base": 0, "per_increment": 1 },
-        "max": 10
-    },
-    SUPPLIER.BLUE_COIN: {
-        "resource": "Blue Coin",
-        "increment": 0.125,
-        "work_units": { "base": 0, "per_increment": 1 },
-        "max": 10
-    },
-    SUPPLIER.PURPLE_COIN: {
-        "resource": "Purple Coin",
-        "increment": 0.0625,
-        "work_units": { "base": 0, "per_increment": 1 },
-        "max": 10
-    },
-    SUPPLIER.PASTURE_UPGRADE: {
-        "work_units": { "base": 0, "per_increment": 0.5 },
-        "max": 3,
-        "min": 3
-    },
-    SUPPLIER.PASSIVE: {
-        "work_units": { "base": 0, "per_increment": 1 },
-        "max": 1,
-        "min": 1
-    },
-}
+#Suppliers with "happiness" get the happiness production boost added to their work units per increment
+supplier_stats: dict[SUPPLIER, dict[str, Any]]
 
 #Stores the valid suppliers for each building type
-group_suppliers = {
-    BUILDING_GROUP.PRODUCER: [SUPPLIER.WORKER_TYPE_1],
-    BUILDING_GROUP.CRAFTER: [SUPPLIER.WORKER_TYPE_2, SUPPLIER.STEAM],
-    BUILDING_GROUP.PASSIVE: [SUPPLIER.PASSIVE],
-    BUILDING_GROUP.CONVERTER: [],
-}
+group_suppliers: dict[BUILDING_GROUP, list[SUPPLIER]]
 
 #Stores supplier mods for individual buildings
-building_supplier_mods = {
-    CRAFTER.LUMBER_MILL: { "enable": [SUPPLIER.YELLOW_COIN] },
-    CRAFTER.FOOD_MILL: { "enable": [SUPPLIER.YELLOW_COIN] },
-    CRAFTER.TAILOR: { "enable": [SUPPLIER.YELLOW_COIN] },
-    CRAFTER.STONE_MASON: { "enable": [SUPPLIER.YELLOW_COIN] },
-    CRAFTER.PASTURE: { "enable": [SUPPLIER.YELLOW_COIN, SUPPLIER.PASTURE_UPGRADE], "disable": [SUPPLIER.STEAM] },
-    CRAFTER.FORGE: { "enable": [SUPPLIER.YELLOW_COIN] },
-    CRAFTER.KITCHEN: { "enable": [SUPPLIER.YELLOW_COIN] },
-    PRODUCER.FISHERY: { "enable": [SUPPLIER.WORKER_TYPE_2, SUPPLIER.RED_COIN], "disable": [SUPPLIER.WORKER_TYPE_1] },
-    CRAFTER.WORKSHOP: { "enable": [SUPPLIER.RED_COIN] },
-    CRAFTER.MACHINE_SHOP: { "enable": [SUPPLIER.RED_COIN] },
-    CRAFTER.MEDICINE_HUT: { "enable": [SUPPLIER.RED_COIN], "disable": [SUPPLIER.STEAM] },
-    CRAFTER.STEAM_GENERATOR: { "enable": [SUPPLIER.YELLOW_COIN], "disable": [SUPPLIER.STEAM] },
-    CRAFTER.LABORATORY: { "enable": [SUPPLIER.RED_COIN], "disable": [SUPPLIER.STEAM] },
-    CRAFTER.MAGE_TOWER: { "enable": [SUPPLIER.BLUE_COIN], "disable": [SUPPLIER.STEAM] },
-    CRAFTER.MAGIC_FORGE: { "enable": [SUPPLIER.BLUE_COIN] },
-    CRAFTER.ELEMENTAL_REFINERY: { "enable": [SUPPLIER.RED_COIN] },
-    CRAFTER.ENCHANTER: { "enable": [SUPPLIER.BLUE_COIN], "disable": [SUPPLIER.STEAM] },
-    PASSIVE.RECHARGER: { "enable": [SUPPLIER.YELLOW_COIN] },
-    PASSIVE.FIRE_TEMPLE: { "enable": [SUPPLIER.RED_COIN] },
-    PASSIVE.WATER_TEMPLE: { "enable": [SUPPLIER.BLUE_COIN] },
-    PASSIVE.AIR_TEMPLE: { "enable": [SUPPLIER.YELLOW_COIN] },
-    PASSIVE.EARTH_TEMPLE: { "enable": [SUPPLIER.PURPLE_COIN] },
-}
+building_supplier_mods: dict[BUILDING, dict[str, list[SUPPLIER]]]
+
+#Loads the supplier data from the given JSON file
+#Supplier resources which are item names are loaded as the item
+def LoadSuppliers(path: str = SUPPLIERS_PATH):
+    global supplier_stats, group_suppliers, building_supplier_mods
+    with open(path, encoding="utf-8") as file:
+        data = json.load(file)
+    supplier_stats = dict()
+    for name, stats in data["suppliers"].items():
+        if "resource" in stats and IsItem(stats["resource"]):
+            stats["resource"] = GetItem(stats["resource"])
+        supplier_stats[SUPPLIER[name]] = stats
+    group_suppliers = {BUILDING_GROUP[name]: [SUPPLIER[supplier] for supplier in suppliers] for name, suppliers in data["group_suppliers"].items()}
+    building_supplier_mods = {GetBuilding(name): {mod: [SUPPLIER[supplier] for supplier in suppliers] for mod, suppliers in mods.items()} for name, mods in data["building_supplier_mods"].items()}
+    GetBoostedBuildingConfig.cache_clear()
+
+#Loads the supplier data if it hasn't been loaded yet
+def LoadSuppliers_Internal():
+    if "supplier_stats" not in globals():
+        LoadSuppliers()
+
+#The supplier data is loaded the first time one of it's module attributes is used, after that they're normal module attributes
+def __getattr__(name: str) -> Any:
+    if name in ("supplier_stats", "group_suppliers", "building_supplier_mods"):
+        LoadSuppliers_Internal()
+        return globals()[name]
+    raise AttributeError(f"module {__name__} has no attribute {name}")
 
 #Gets the suppliers for the given building
 def GetSuppliers(building: BUILDING) -> list[SUPPLIER]:
+    LoadSuppliers_Internal()
     group = GetBuildingGroup(building)
     suppliers = group_suppliers[group].copy()
 
@@ -121,14 +76,20 @@ def GetSuppliers(building: BUILDING) -> list[SUPPLIER]:
 class BuildingConfig():
     building: BUILDING
     optimal: bool
+    #Stores the happiness production boost the work units were calculated with
+    productionBoost: float
 
     work_units: int
     suppliers: dict[SUPPLIER, float]
     resources: dict[SUPPLIER, ITEM | str]
+    #Stores the supplier resources which are items and their quantities
+    itemSuppliers: dict[ITEM, float]
 
-    def __init__(self, building: BUILDING, optimal: bool = True) -> None:
+    #The production boost defaults to the one from the current happiness
+    def __init__(self, building: BUILDING, optimal: bool = True, productionBoost: float | None = None) -> None:
         self.building = building
         self.optimal = optimal
+        self.productionBoost = Happiness.GetCurrentProductionBoost() if productionBoost is None else productionBoost
 
         self.work_units = 0
         self.suppliers = dict()
@@ -142,15 +103,35 @@ class BuildingConfig():
             
             if (count > 0):
                 self.work_units += stats["work_units"]["base"]
-                self.work_units += stats["work_units"]["per_increment"] * count
+                per_increment = stats["work_units"]["per_increment"]
+                if stats["work_units"].get("happiness", False):
+                    per_increment += self.productionBoost
+                self.work_units += per_increment * count
                 self.suppliers[supplier] = stats.get("increment", 1) * count
                 if "resource" in stats:
                     self.resources[supplier] = stats["resource"]
-    
-    #Returns a list of supplier resources which are items and their quantities
-    def GetItemSuppliers(self) -> dict[ITEM, float]:
-        result: dict[ITEM, float] = dict()
+
+        #Find the supplier resources which are items once, they're needed for every update of a production line
+        self.itemSuppliers = dict()
         for supplier, resource in self.resources.items():
             if isinstance(resource, NATURAL_RESOURCE | CRAFTING_ITEM | POWER):
-                result[resource] = self.suppliers[supplier]
-        return result
+                self.itemSuppliers[resource] = self.suppliers[supplier]
+    
+    #Returns a list of supplier resources which are items and their quantities (shared, don't change it)
+    def GetItemSuppliers(self) -> dict[ITEM, float]:
+        return self.itemSuppliers
+
+#The number of building configs kept by GetBuildingConfig
+BUILDING_CONFIG_CACHE_SIZE = 1024
+
+#Returns the building config for the given building in the given town state (None for the default town state), shared so don't change it
+def GetBuildingConfig(building: BUILDING, optimal: bool = True, state: Town.TownState | None = None) -> BuildingConfig:
+    if state is None:
+        state = Town.defaultState
+    return GetBoostedBuildingConfig(building, optimal, state.GetProductionBoost())
+
+#Returns the building config for the given building with the given happiness production boost, shared so don't change it
+#Only the happiness changes a building config, so they're memoised by the boost rather than the whole town state (dropping the least recently used)
+@functools.lru_cache(maxsize=BUILDING_CONFIG_CACHE_SIZE)
+def GetBoostedBuildingConfig(building: BUILDING, optimal: bool, productionBoost: float) -> BuildingConfig:
+    return BuildingConfig(building, optimal, productionBoost)